@@ -0,0 +1,19 @@
+import { type NextRequest, NextResponse } from "next/server"
+import { callScoringWorker } from "@/lib/scoring-worker"
+
+// This is a server-side route handler that assesses risks and recommends products in one call
+export async function POST(request: NextRequest) {
+  try {
+    // Parse the request body
+    const farmData = await request.json()
+
+    // The worker feeds its in-memory risk assessment straight into the recommendations
+    const report = await callScoringWorker("farm-report", farmData)
+
+    // Return both results: { riskAssessment, recommendations, timestamp }
+    return NextResponse.json(report)
+  } catch (error) {
+    console.error("Error in farm report:", error)
+    return NextResponse.json({ error: "Failed to process farm report" }, { status: 500 })
+  }
+}
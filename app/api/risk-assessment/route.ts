@@ -1,11 +1,5 @@
 import { type NextRequest, NextResponse } from "next/server"
-import { exec } from "child_process"
-import { promisify } from "util"
-import fs from "fs"
-import path from "path"
-
-// Convert exec to Promise-based
-const execPromise = promisify(exec)
+import { callScoringWorker } from "@/lib/scoring-worker"
 
 // This is a server-side route handler that will process farm data using Python
 export async function POST(request: NextRequest) {
@@ -13,27 +7,10 @@ export async function POST(request: NextRequest) {
     // Parse the request body
     const farmData = await request.json()
 
-    // Create a temporary JSON file to pass data to Python
-    const tempFilePath = path.join("/tmp", "farm_data.json")
-    fs.writeFileSync(tempFilePath, JSON.stringify(farmData))
-
-    // Execute the Python script for risk assessment
+    // Score the farm on the long-lived Python worker
     // Note: In a real production environment, you would need to ensure Python is available
     // and the script is properly deployed. This is a simplified example.
-    const { stdout, stderr } = await execPromise(
-      `python3 ${path.join(process.cwd(), "scripts/risk_assessment.py")} ${tempFilePath}`,
-    )
-
-    if (stderr) {
-      console.error("Python script error:", stderr)
-      return NextResponse.json({ error: "Error processing risk assessment" }, { status: 500 })
-    }
-
-    // Parse the Python script output
-    const riskAssessment = JSON.parse(stdout)
-
-    // Clean up the temporary file
-    fs.unlinkSync(tempFilePath)
+    const riskAssessment = await callScoringWorker("risk-assessment", farmData)
 
     // Return the risk assessment
     return NextResponse.json(riskAssessment)
@@ -42,4 +19,3 @@ export async function POST(request: NextRequest) {
     return NextResponse.json({ error: "Failed to process risk assessment" }, { status: 500 })
   }
 }
-
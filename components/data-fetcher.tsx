@@ -9,8 +9,7 @@ import {
   fetchWeatherData1,
   fetchSoilData,
   fetchVegetationData,
-  getRiskAssessment,
-  getProductRecommendations,
+  getFarmReport,
 } from "@/lib/api-services"
 
 interface DataFetcherProps {
@@ -81,19 +80,12 @@ export default function DataFetcher({
 
       setProgress("Analyzing risks...")
 
-      // Get risk assessment
-      const riskAssessment = await getRiskAssessment(combinedData)
+      // Get the risk assessment and product recommendations in one request
+      const { riskAssessment, recommendations, timestamp } = await getFarmReport(combinedData)
 
       // Notify parent component
       onRiskAssessmentComplete(riskAssessment)
-
-      setProgress("Generating recommendations...")
-
-      // Get product recommendations
-      const recommendations = await getProductRecommendations(combinedData, riskAssessment)
-
-      // Notify parent component
-      onRecommendationsComplete(recommendations)
+      onRecommendationsComplete({ recommendations, timestamp })
 
       setProgress("Complete!")
       setLoading(false)
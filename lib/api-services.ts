@@ -165,6 +165,30 @@ export async function getRiskAssessment(farmData: any) {
   }
 }
 
+// Function to get the risk assessment and product recommendations in one request
+export async function getFarmReport(farmData: any) {
+  const url = "/api/farm-report";
+
+  try {
+    const response = await fetch(url, {
+      method: "POST",
+      headers: {
+        "Content-Type": "application/json",
+      },
+      body: JSON.stringify(farmData),
+    });
+
+    if (!response.ok) {
+      throw new Error(`Failed to get farm report: ${response.statusText}`);
+    }
+
+    return await response.json();
+  } catch (error) {
+    console.error("Error getting farm report:", error);
+    throw error;
+  }
+}
+
 const fetch_location_api =
   "https://api.positionstack.com/v1/forward?access_key=5729e40e63059907a9158a57800aca3c&query=";
 // https://api.positionstack.com/v1/forward?access_key=5729e40e63059907a9158a57800aca3c&query=Main%20road%20Kareli%20MP,%20India
@@ -0,0 +1,120 @@
+import { spawn, type ChildProcessWithoutNullStreams } from "child_process"
+import path from "path"
+import readline from "readline"
+
+// Server-side client for scripts/scoring_worker.py
+// One Python process is kept alive and shared by every route handler. Requests are
+// tagged with an id so many of them can be in flight on the same pipe at once.
+// When SCORING_SERVICE_URL is set (e.g. http://127.0.0.1:8765), requests go to
+// scripts/scoring_service.py instead, which micro-batches concurrent requests.
+
+type PendingRequest = {
+  resolve: (result: any) => void
+  reject: (error: Error) => void
+  timer: NodeJS.Timeout
+}
+
+// How long a request may wait for the worker before its route gives up
+const requestTimeoutMs = Number(process.env.SCORING_WORKER_TIMEOUT_MS) || 30000
+
+let worker: ChildProcessWithoutNullStreams | null = null
+let nextRequestId = 0
+const pending = new Map<string, PendingRequest>()
+
+// Fail every outstanding request and let the next call start a fresh worker
+function failWorker(child: ChildProcessWithoutNullStreams, error: Error) {
+  if (worker !== child) {
+    return
+  }
+  worker = null
+  for (const request of pending.values()) {
+    clearTimeout(request.timer)
+    request.reject(error)
+  }
+  pending.clear()
+  child.kill()
+}
+
+function startWorker() {
+  const child = spawn("python3", [path.join(process.cwd(), "scripts/scoring_worker.py")])
+
+  // Each line on stdout is one response, matched back to its caller by id
+  readline.createInterface({ input: child.stdout }).on("line", (line) => {
+    let response: any
+    try {
+      response = JSON.parse(line)
+    } catch (error) {
+      console.error("Invalid response from scoring worker:", line)
+      return
+    }
+
+    const request = pending.get(String(response.id))
+    if (!request) {
+      return
+    }
+    pending.delete(String(response.id))
+    clearTimeout(request.timer)
+
+    if (response.error) {
+      request.reject(new Error(response.error))
+    } else {
+      request.resolve(response.result)
+    }
+  })
+
+  child.stderr.on("data", (data) => {
+    console.error("Scoring worker error:", data.toString())
+  })
+
+  // Without these handlers a failed spawn or a write to a dead worker (EPIPE)
+  // is an unhandled 'error' event that takes the whole server down
+  child.on("error", (error) => {
+    failWorker(child, new Error(`Scoring worker failed: ${error.message}`))
+  })
+  child.stdin.on("error", (error) => {
+    failWorker(child, new Error(`Scoring worker input failed: ${error.message}`))
+  })
+
+  child.on("exit", (code) => {
+    failWorker(child, new Error(`Scoring worker exited with code ${code}`))
+  })
+
+  return child
+}
+
+const scoringServiceUrl = process.env.SCORING_SERVICE_URL
+
+async function callScoringService(method: string, params: any): Promise<any> {
+  const response = await fetch(`${scoringServiceUrl}/${method}`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify(params),
+    signal: AbortSignal.timeout(requestTimeoutMs),
+  })
+
+  const result = await response.json()
+  if (!response.ok) {
+    throw new Error(result.error || `Scoring service returned ${response.status}`)
+  }
+  return result
+}
+
+export function callScoringWorker(method: string, params: any): Promise<any> {
+  if (scoringServiceUrl) {
+    return callScoringService(method, params)
+  }
+
+  if (!worker) {
+    worker = startWorker()
+  }
+
+  const id = String(nextRequestId++)
+  return new Promise((resolve, reject) => {
+    const timer = setTimeout(() => {
+      pending.delete(id)
+      reject(new Error(`Scoring worker did not answer ${method} within ${requestTimeoutMs} ms`))
+    }, requestTimeoutMs)
+    pending.set(id, { resolve, reject, timer })
+    worker!.stdin.write(JSON.stringify({ id, method, params }) + "\n")
+  })
+}
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Application Schedule
+
+Batch application timing for recommended products. Every timing window is
+3, 5, 7, 10 or 14 days out, so the window dates for a reference day are
+formatted once into a small table and every product x crop pair is
+assigned a window by comparing its risk score against the thresholds.
+Scoring a catalog then makes no datetime, timedelta or strftime calls per
+product.
+
+application_calendar() lays a farm's recommendations out week by week.
+"""
+
+import functools
+from datetime import datetime, timedelta
+
+# Days until application -> (window, urgency)
+TIMING_WINDOWS = {
+    3: ('Next 3 Days', 'High'),
+    5: ('Within 5 Days', 'Medium-High'),
+    7: ('Within 7 Days', 'Medium'),
+    10: ('Within 10 Days', 'Medium'),
+    14: ('Within 14 Days', 'Low')
+}
+WINDOW_DAYS = {window: days for days, (window, urgency) in TIMING_WINDOWS.items()}
+
+DEFAULT_WINDOW_DAYS = 7
+
+# Three weeks cover every window, the longest being 14 days out
+DEFAULT_CALENDAR_WEEKS = 3
+
+def reference_day(reference_date=None):
+    """
+    Return the calendar day of a date or datetime, today when omitted
+    """
+    if reference_date is None:
+        reference_date = datetime.now()
+    if isinstance(reference_date, datetime):
+        return reference_date.date()
+    return reference_date
+
+@functools.lru_cache(maxsize=16)
+def date_table(day):
+    """
+    Return {days: (window, urgency, date)} for every window, counted from a date
+
+    Tables are cached per day and shared by every caller, so the entries
+    are tuples; timing() turns one into the dict attached to a response.
+    """
+    return {
+        days: (window, urgency, (day + timedelta(days=days)).strftime('%Y-%m-%d'))
+        for days, (window, urgency) in TIMING_WINDOWS.items()
+    }
+
+def timing(entry):
+    """
+    Return a new applicationTiming dict for a date table entry
+    """
+    window, urgency, date = entry
+    return {'window': window, 'urgency': urgency, 'date': date}
+
+def window_days(product_type, crop_risks, risk_assessment):
+    """
+    Return how many days out a product type should be applied for one crop
+
+    Mirrors the thresholds of recommendations.get_application_timing.
+    """
+    if product_type == 'Pest Control' and 'pest' in crop_risks:
+        pest_risk = crop_risks['pest']['overall']
+        if pest_risk > 80:
+            return 3
+        if pest_risk > 60:
+            return 5
+
+    elif product_type == 'Disease Control' and 'disease' in crop_risks:
+        disease_risk = crop_risks['disease']['overall']
+        if disease_risk > 80:
+            return 3
+        if disease_risk > 60:
+            return 5
+
+    elif product_type == 'Soil Health' and 'soilHealth' in risk_assessment:
+        return 10 if risk_assessment['soilHealth']['overall'] < 40 else 14
+
+    elif product_type == 'Growth Promoter' and 'climate' in crop_risks:
+        return 5 if crop_risks['climate']['overall'] > 70 else 10
+
+    return DEFAULT_WINDOW_DAYS
+
+def schedule_timings(pairs, risk_assessment, reference_date=None):
+    """
+    Assign application timing to every (product, crop type) pair in one pass
+
+    The window for each (crop, product type) is worked out once and every
+    pair then reads its timing from the date table. Returns a new timing
+    dict per pair, in the order of pairs. reference_date may be a date or
+    a datetime.
+    """
+    table = date_table(reference_day(reference_date))
+    crop_risks = risk_assessment['cropRisks']
+
+    windows = {}
+    timings = []
+    for product, crop_type in pairs:
+        key = (crop_type, product['type'])
+        days = windows.get(key)
+        if days is None:
+            days = windows[key] = window_days(product['type'], crop_risks.get(crop_type, {}), risk_assessment)
+        timings.append(timing(table[days]))
+    return timings
+
+def application_calendar(recommendations, reference_date=None, weeks=DEFAULT_CALENDAR_WEEKS):
+    """
+    Group a farm's recommendations into weekly application slots
+
+    Each week lists the applications whose window date falls in it, by
+    date. Applications beyond the last week are left out.
+    """
+    start = reference_day(reference_date)
+
+    calendar = [
+        {
+            'week': week + 1,
+            'start': (start + timedelta(days=7 * week)).strftime('%Y-%m-%d'),
+            'end': (start + timedelta(days=7 * week + 6)).strftime('%Y-%m-%d'),
+            'applications': []
+        }
+        for week in range(weeks)
+    ]
+
+    for recommendation in recommendations:
+        timing = recommendation['applicationTiming']
+        days = WINDOW_DAYS.get(timing['window'])
+        if days is None or days // 7 >= weeks:
+            continue
+        product = recommendation.get('product')
+        calendar[days // 7]['applications'].append({
+            'productId': product['id'] if product else recommendation.get('productId'),
+            'cropType': recommendation['cropType'],
+            'date': timing['date'],
+            'window': timing['window'],
+            'urgency': timing['urgency']
+        })
+
+    for week in calendar:
+        week['applications'].sort(key=lambda application: application['date'])
+    return calendar
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Historical Backtest
+
+This module replays multi-year daily weather archives through the risk
+calculators to calibrate their thresholds against past seasons. For every
+day and crop it computes the risk of the window of days ending that day,
+exactly as assess_farm would score that window.
+
+Archives are directories of .npy columns (temperature, humidity, rainfall
+and optionally temperature_max/temperature_min), each shaped (locations x
+days) or (days,), plus an optional meta.json with a startDate. They are
+memory-mapped and processed a block of locations at a time, so archives
+larger than memory can be replayed.
+
+Every day is scored against the threshold bands once. Prefix sums of those
+daily points along the time axis then give any window's band totals as one
+subtraction, so sliding the window costs the same for 7 days as for 90.
+
+Usage:
+    python3 backtest.py pack weather.ndjson archive/ [--start-date 2015-01-01]
+    python3 backtest.py run archive/ results/ --window 14 --crops Cotton,Chickpea
+
+Results are float32 arrays shaped (locations x windows x crops), one per
+risk (disease.npy, pest.npy, climate.npy, thermal.npy), with --factors also
+one per factor, and a meta.json describing the axes. Window i ends on day
+window - 1 + i of the archive.
+"""
+
+import os
+import sys
+import json
+import argparse
+from datetime import date, timedelta
+
+import numpy as np
+
+from batch_scoring import daily_points, extreme_columns, score_factor_sums, thermal_hits, weather_columns
+
+ARCHIVE_FIELDS = ('temperature', 'humidity', 'rainfall', 'temperature_max', 'temperature_min')
+REQUIRED_FIELDS = ('temperature', 'humidity', 'rainfall')
+
+DEFAULT_WINDOW_DAYS = 14
+
+# Locations scored per block; bounds memory to a few arrays of this many rows
+DEFAULT_CHUNK_ROWS = 64
+
+def write_archive(archive_dir, columns, meta=None):
+    """
+    Write (locations x days) weather columns as an archive directory
+    """
+    os.makedirs(archive_dir, exist_ok=True)
+    for field, values in columns.items():
+        np.save(os.path.join(archive_dir, f"{field}.npy"), np.asarray(values, dtype=np.float64))
+    with open(os.path.join(archive_dir, 'meta.json'), 'w') as f:
+        json.dump(meta or {}, f)
+
+def open_archive(archive_dir):
+    """
+    Memory-map an archive's columns as (locations x days) arrays
+
+    Returns (columns, meta). Missing daily extremes fall back to the daily
+    temperature.
+    """
+    columns = {}
+    for field in ARCHIVE_FIELDS:
+        path = os.path.join(archive_dir, f"{field}.npy")
+        if os.path.exists(path):
+            values = np.load(path, mmap_mode='r')
+            columns[field] = values[None, :] if values.ndim == 1 else values
+        elif field in REQUIRED_FIELDS:
+            raise ValueError(f"Archive {archive_dir} has no {field}.npy")
+
+    shape = columns['temperature'].shape
+    for field, values in columns.items():
+        if values.shape != shape:
+            raise ValueError(f"{field}.npy is shaped {values.shape}, expected {shape}")
+    columns.setdefault('temperature_max', columns['temperature'])
+    columns.setdefault('temperature_min', columns['temperature'])
+
+    meta_path = os.path.join(archive_dir, 'meta.json')
+    meta = {}
+    if os.path.exists(meta_path):
+        with open(meta_path, 'r') as f:
+            meta = json.load(f)
+    return columns, meta
+
+def window_sums(values, window):
+    """
+    Sum values over every window of consecutive days along axis 1
+
+    A prefix sum with a leading zero turns each window total into one
+    subtraction: sums[:, i] = prefix[:, i + window] - prefix[:, i].
+    """
+    prefix = np.zeros((values.shape[0], values.shape[1] + 1) + values.shape[2:], dtype=np.int64)
+    np.cumsum(values, axis=1, out=prefix[:, 1:])
+    return prefix[:, window:] - prefix[:, :-window]
+
+def backtest_block(columns, start, stop, window, crop_types):
+    """
+    Score every window for locations start:stop of an archive
+
+    Returns the score dict of score_factor_sums, every array shaped
+    (locations x windows x crops).
+    """
+    block = {field: np.asarray(values[start:stop], dtype=np.float64) for field, values in columns.items()}
+
+    points = daily_points(block['temperature'], block['humidity'], block['rainfall'])
+    sums = {name: window_sums(values, window) for name, values in points.items()}
+    above_optimum, above_limit, frost_days = (
+        window_sums(hits, window)
+        for hits in thermal_hits(block['temperature_max'], block['temperature_min'], crop_types)
+    )
+    return score_factor_sums(sums, above_optimum, above_limit, frost_days, window, crop_types)
+
+def _outputs(scores, with_factors):
+    """
+    Flatten a score dict into (output name, array) pairs
+    """
+    for risk, result in scores.items():
+        yield risk, result['overall']
+        if with_factors:
+            for factor, values in result['factors'].items():
+                yield f"{risk}_{factor}", values
+
+def run_backtest(archive_dir, output_dir, window, crop_types, chunk_rows=DEFAULT_CHUNK_ROWS, with_factors=False):
+    """
+    Backtest an archive and write the result arrays and meta.json to output_dir
+    """
+    columns, meta = open_archive(archive_dir)
+    locations, days = columns['temperature'].shape
+    windows = days - window + 1
+    if window < 1 or windows < 1:
+        raise ValueError(f"A {window}-day window does not fit in {days} days of weather")
+
+    os.makedirs(output_dir, exist_ok=True)
+    outputs = {}
+    for start in range(0, locations, chunk_rows):
+        stop = min(start + chunk_rows, locations)
+        scores = backtest_block(columns, start, stop, window, crop_types)
+        for name, values in _outputs(scores, with_factors):
+            if name not in outputs:
+                # Written through a memory map, so results never have to fit in memory
+                outputs[name] = np.lib.format.open_memmap(
+                    os.path.join(output_dir, f"{name}.npy"), mode='w+', dtype=np.float32,
+                    shape=(locations, windows, len(crop_types)))
+            outputs[name][start:stop] = values
+    for values in outputs.values():
+        values.flush()
+
+    result_meta = {
+        'archive': archive_dir,
+        'window': window,
+        'crops': list(crop_types),
+        'locations': locations,
+        'days': days,
+        'windows': windows,
+        'firstWindowEndDay': window - 1,
+        'arrays': sorted(outputs)
+    }
+    if meta.get('startDate'):
+        first_end = date.fromisoformat(meta['startDate']) + timedelta(days=window - 1)
+        result_meta['firstWindowEndDate'] = first_end.isoformat()
+    with open(os.path.join(output_dir, 'meta.json'), 'w') as f:
+        json.dump(result_meta, f)
+    return result_meta
+
+def pack_archive(input_file, archive_dir, start_date=None):
+    """
+    Pack the weatherData of NDJSON farm records (one location per line, all
+    of the same length) into an archive
+    """
+    with open(input_file, 'r') as f:
+        farms = [json.loads(line) for line in f if line.strip()]
+
+    temperature, humidity, rainfall = weather_columns(farms)
+    temperature_max, temperature_min = extreme_columns(farms)
+    meta = {'locations': [farm.get('location') for farm in farms]}
+    if start_date:
+        meta['startDate'] = start_date
+    write_archive(archive_dir, {
+        'temperature': temperature,
+        'humidity': humidity,
+        'rainfall': rainfall,
+        'temperature_max': temperature_max,
+        'temperature_min': temperature_min
+    }, meta)
+    return {'locations': temperature.shape[0], 'days': temperature.shape[1], 'archive': archive_dir}
+
+def main():
+    """
+    Main function to pack weather archives and run backtests over them
+    """
+    parser = argparse.ArgumentParser(description='Backtest crop risk scores over historical weather archives')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    pack_parser = subparsers.add_parser('pack', help='Pack NDJSON farm weather into an archive')
+    pack_parser.add_argument('input_file', help='NDJSON farm records, one location per line')
+    pack_parser.add_argument('archive_dir', help='Archive directory to write')
+    pack_parser.add_argument('--start-date', help='Date of the first day (YYYY-MM-DD)')
+
+    run_parser = subparsers.add_parser('run', help='Score every window of an archive')
+    run_parser.add_argument('archive_dir', help='Archive directory of .npy weather columns')
+    run_parser.add_argument('output_dir', help='Directory for the result arrays')
+    run_parser.add_argument('--window', type=int, default=DEFAULT_WINDOW_DAYS, help='Window length in days')
+    run_parser.add_argument('--crops', required=True, help='Comma-separated crop types to score')
+    run_parser.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS, help='Locations scored per block')
+    run_parser.add_argument('--factors', action='store_true', help='Also write every factor score')
+    args = parser.parse_args()
+
+    try:
+        if args.command == 'pack':
+            result = pack_archive(args.input_file, args.archive_dir, args.start_date)
+        else:
+            crop_types = [crop_type.strip() for crop_type in args.crops.split(',') if crop_type.strip()]
+            result = run_backtest(args.archive_dir, args.output_dir, args.window, crop_types,
+                                  args.chunk_rows, args.factors)
+        print(json.dumps(result))
+    except Exception as e:
+        print(json.dumps({"error": str(e)}))
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
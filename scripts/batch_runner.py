@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Batch Runner
+
+Shared NDJSON batch execution for risk_assessment.py and recommendations.py.
+Records are processed inline, or sharded across a process pool in chunks so
+the pickling cost is paid once per chunk rather than once per farm. Output
+order always matches input order.
+"""
+
+import os
+import sys
+import time
+import collections
+import multiprocessing
+
+DEFAULT_CHUNK_SIZE = 256
+
+def _chunks(lines, chunk_size):
+    """
+    Group input lines into (first line number, [lines]) chunks
+    """
+    chunk = []
+    first_line_number = 1
+    for line_number, line in enumerate(lines, 1):
+        if not chunk:
+            first_line_number = line_number
+        chunk.append(line)
+        if len(chunk) == chunk_size:
+            yield first_line_number, chunk
+            chunk = []
+    if chunk:
+        yield first_line_number, chunk
+
+def _process_chunk(process_line, first_line_number, lines):
+    """
+    Process one chunk inside a pool worker and time it
+    """
+    start = time.perf_counter()
+    outputs = [process_line(line_number, line) for line_number, line in enumerate(lines, first_line_number)]
+    return os.getpid(), time.perf_counter() - start, outputs
+
+def _record_stats(stats, pid, elapsed, count):
+    worker = stats.setdefault(pid, {'records': 0, 'seconds': 0.0})
+    worker['records'] += count
+    worker['seconds'] += elapsed
+
+def run_pool(process_line, lines, workers, chunk_size=DEFAULT_CHUNK_SIZE, stats=None):
+    """
+    Yield process_line(line_number, line) for every line, in order, using a pool
+
+    process_line must be a module-level function so it can be sent to the
+    workers; lines for which it returns None (e.g. blank lines) are skipped.
+    At most two chunks per worker are in flight, which keeps memory bounded
+    for inputs of any size. Per-worker record counts and busy time are
+    accumulated into stats, keyed by worker pid.
+    """
+    if stats is None:
+        stats = {}
+
+    with multiprocessing.Pool(workers) as pool:
+        pending = collections.deque()
+        for first_line_number, chunk in _chunks(lines, chunk_size):
+            pending.append(pool.apply_async(_process_chunk, (process_line, first_line_number, chunk)))
+            if len(pending) >= workers * 2:
+                pid, elapsed, outputs = pending.popleft().get()
+                _record_stats(stats, pid, elapsed, len(outputs))
+                yield from (output for output in outputs if output is not None)
+
+        while pending:
+            pid, elapsed, outputs = pending.popleft().get()
+            _record_stats(stats, pid, elapsed, len(outputs))
+            yield from (output for output in outputs if output is not None)
+
+def format_worker_stats(stats, wall_seconds):
+    """
+    Summarize per-worker throughput as human-readable lines
+    """
+    lines = []
+    total = 0
+    for pid, worker in sorted(stats.items()):
+        total += worker['records']
+        rate = worker['records'] / worker['seconds'] if worker['seconds'] else 0.0
+        lines.append(f"worker {pid}: {worker['records']} records in {worker['seconds']:.2f}s ({rate:.0f} records/s)")
+    rate = total / wall_seconds if wall_seconds else 0.0
+    lines.append(f"total: {total} records in {wall_seconds:.2f}s ({rate:.0f} records/s) across {len(stats)} workers")
+    return lines
+
+def run_ndjson(process_line, input_file, workers=0, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Stream an NDJSON file (or stdin when '-') through process_line to stdout
+
+    With workers > 0 the records are sharded across a process pool and the
+    per-worker throughput report is written to stderr.
+    """
+    stream = sys.stdin if input_file == '-' else open(input_file, 'r')
+    try:
+        if not workers:
+            for line_number, line in enumerate(stream, 1):
+                output_line = process_line(line_number, line)
+                if output_line is not None:
+                    sys.stdout.write(output_line + '\n')
+                    sys.stdout.flush()
+            return
+
+        stats = {}
+        start = time.perf_counter()
+        for output_line in run_pool(process_line, stream, workers, chunk_size, stats):
+            sys.stdout.write(output_line + '\n')
+        sys.stdout.flush()
+
+        for report_line in format_worker_stats(stats, time.perf_counter() - start):
+            print(report_line, file=sys.stderr)
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
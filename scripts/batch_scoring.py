@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""
+Batch Scoring Engine
+
+This module scores disease, pest, climate and thermal risk for many farms
+and crops at once, and soil health for whole soil-sampling grids. Inputs are
+columnar NumPy arrays and every threshold rule from risk_assessment.py is
+evaluated as one array operation, so the weather is scanned once per batch
+instead of three times per crop.
+
+Results are identical to what assess_farm and assess_soil_health produce
+record by record.
+"""
+
+from datetime import datetime
+
+import numpy as np
+
+from crop_params import REGISTRY, crop_id
+from weather_series import WeatherSeries
+
+def _multipliers(crop_types, *names):
+    """
+    Look up registry multipliers for the given crop types, one row per name
+    """
+    crops = [crop_id(crop_type) for crop_type in crop_types]
+    return [np.array([REGISTRY[name][crop] for crop in crops], dtype=np.float64) for name in names]
+
+def _column(farms, field, key, default_key=None):
+    """
+    Stack one weather field of several farms into a (farms x days) array
+    """
+    rows = []
+    for farm in farms:
+        weather_data = farm['weatherData']
+        if isinstance(weather_data, WeatherSeries):
+            rows.append(np.frombuffer(getattr(weather_data, field), dtype=np.float64))
+        elif default_key is None:
+            rows.append([day[key] for day in weather_data])
+        else:
+            # Absent or null values fall back to default_key, as in summarize_weather
+            rows.append([v if (v := day.get(key)) is not None else day[default_key] for day in weather_data])
+    return np.array(rows, dtype=np.float64)
+
+def weather_columns(farms):
+    """
+    Convert the weatherData of several farms into (farms x days) arrays
+
+    weatherData may be a list of daily dicts or a WeatherSeries. All farms
+    must carry the same number of days.
+    """
+    return (_column(farms, 'temperature', 'temperature'),
+            _column(farms, 'humidity', 'humidity'),
+            _column(farms, 'rainfall', 'rainfall'))
+
+def extreme_columns(farms):
+    """
+    Convert the daily maximum and minimum temperatures of several farms into
+    (farms x days) arrays, falling back to the daily temperature where a
+    value is absent or null
+    """
+    return (_column(farms, 'temperature_max', 'temperatureMax', 'temperature'),
+            _column(farms, 'temperature_min', 'temperatureMin', 'temperature'))
+
+def daily_points(temperature, humidity, rainfall):
+    """
+    Score every day against the disease, pest and climate threshold bands
+
+    Returns the daily points of each factor, shaped like the inputs.
+    Summing them over a window and passing the sums to score_factor_sums
+    gives that window's risk scores.
+    """
+    return {
+        # Disease factors
+        'diseaseHumidity': np.where(humidity > 80, 10, np.where(humidity > 70, 5, 0)),
+        'diseaseTemperature': np.where((18 <= temperature) & (temperature <= 28), 8,
+                                       np.where((15 <= temperature) & (temperature <= 30), 4, 0)),
+        'diseaseRainfall': np.where(rainfall > 10, 12, np.where(rainfall > 5, 6, 0)),
+
+        # Pest factors
+        'pestTemperature': np.where(temperature > 30, 12,
+                                    np.where(temperature > 25, 8, np.where(temperature > 20, 4, 0))),
+        'pestHumidity': np.where((60 <= humidity) & (humidity <= 80), 10,
+                                 np.where((50 <= humidity) & (humidity <= 90), 5, 0)),
+
+        # Climate factors
+        'climateHeat': np.where(temperature > 35, 15,
+                                np.where(temperature > 32, 8, np.where(temperature > 30, 4, 0))),
+        'climateDrought': np.where((rainfall < 1) & (temperature > 30), 10, np.where(rainfall < 2, 5, 0)),
+        'climateFlood': np.where(rainfall > 50, 20,
+                                 np.where(rainfall > 30, 12, np.where(rainfall > 20, 6, 0)))
+    }
+
+def thermal_hits(temperature_max, temperature_min, crop_types):
+    """
+    Flag, per day and crop, the days above TMaxOptimum, above TMaxLimit and
+    below TMinFrost from stress_buster.csv
+
+    Returns three boolean arrays with a trailing crops axis. Crops without
+    a limit (NaN) are never flagged.
+    """
+    crops = [crop_id(crop_type) for crop_type in crop_types]
+    limits = [np.array([REGISTRY[name][crop] for crop in crops], dtype=np.float64)
+              for name in ('TMaxOptimum', 'TMaxLimit', 'TMinFrost')]
+    return (temperature_max[..., None] > limits[0],
+            temperature_max[..., None] > limits[1],
+            temperature_min[..., None] < limits[2])
+
+def score_factor_sums(sums, above_optimum, above_limit, frost_days, days, crop_types):
+    """
+    Turn factor points summed over a window of days into risk scores
+
+    sums maps each daily_points factor to its summed points, of any shape;
+    the thermal day counts carry an extra trailing crops axis. Every score
+    in the result has the shape of the sums plus a crops axis, laid out
+    like the dicts returned by the *_from_summary functions.
+    """
+    def normalize(name):
+        return np.minimum(100, sums[name] / days * 10)[..., None]
+
+    # Broadcast the per-window factors against the per-crop multipliers
+    d_h, d_t, d_r = _multipliers(crop_types, 'diseaseHumidity', 'diseaseTemperature', 'diseaseRainfall')
+    disease_humidity = normalize('diseaseHumidity') * d_h
+    disease_temperature = normalize('diseaseTemperature') * d_t
+    disease_rainfall = normalize('diseaseRainfall') * d_r
+
+    p_t, p_h = _multipliers(crop_types, 'pestTemperature', 'pestHumidity')
+    pest_temperature = normalize('pestTemperature') * p_t
+    pest_humidity = normalize('pestHumidity') * p_h
+
+    c_h, c_d, c_f = _multipliers(crop_types, 'climateHeat', 'climateDrought', 'climateFlood')
+    heat = normalize('climateHeat') * c_h
+    drought = normalize('climateDrought') * c_d
+    flood = normalize('climateFlood') * c_f
+
+    # Thermal factors against each crop's stress_buster.csv limits
+    thermal_heat = np.minimum(100, (above_limit * 15 + (above_optimum - above_limit) * 8) / days * 10)
+    thermal_frost = np.minimum(100, frost_days * 15 / days * 10)
+
+    disease_overall = (disease_humidity * 0.4) + (disease_temperature * 0.3) + (disease_rainfall * 0.3)
+    pest_overall = (pest_temperature * 0.6) + (pest_humidity * 0.4)
+    climate_overall = np.maximum(np.maximum(heat, drought), flood)
+
+    return {
+        'disease': {
+            'overall': np.minimum(100, disease_overall),
+            'factors': {
+                'humidity': np.minimum(100, disease_humidity),
+                'temperature': np.minimum(100, disease_temperature),
+                'rainfall': np.minimum(100, disease_rainfall)
+            }
+        },
+        'pest': {
+            'overall': np.minimum(100, pest_overall),
+            'factors': {
+                'temperature': np.minimum(100, pest_temperature),
+                'humidity': np.minimum(100, pest_humidity)
+            }
+        },
+        'climate': {
+            'overall': np.minimum(100, climate_overall),
+            'factors': {
+                'heat': np.minimum(100, heat),
+                'drought': np.minimum(100, drought),
+                'flood': np.minimum(100, flood)
+            }
+        },
+        'thermal': {
+            'overall': np.maximum(thermal_heat, thermal_frost),
+            'factors': {
+                'heat': thermal_heat,
+                'frost': thermal_frost
+            }
+        }
+    }
+
+def score_weather_batch(temperature, humidity, rainfall, crop_types, temperature_max=None, temperature_min=None):
+    """
+    Calculate disease, pest, climate and thermal risk for every farm and crop
+
+    temperature, humidity and rainfall are (farms x days) arrays, and the
+    optional daily extremes default to temperature. Every score in the
+    result is a (farms x crops) array, laid out like the dicts returned by
+    the *_from_summary functions.
+    """
+    temperature = np.asarray(temperature, dtype=np.float64)
+    humidity = np.asarray(humidity, dtype=np.float64)
+    rainfall = np.asarray(rainfall, dtype=np.float64)
+    temperature_max = temperature if temperature_max is None else np.asarray(temperature_max, dtype=np.float64)
+    temperature_min = temperature if temperature_min is None else np.asarray(temperature_min, dtype=np.float64)
+
+    days = temperature.shape[1]
+    if days == 0:
+        raise ValueError("weatherData is empty")
+
+    sums = {name: points.sum(axis=1) for name, points in daily_points(temperature, humidity, rainfall).items()}
+    above_optimum, above_limit, frost_days = (
+        hits.sum(axis=1) for hits in thermal_hits(temperature_max, temperature_min, crop_types)
+    )
+    return score_factor_sums(sums, above_optimum, above_limit, frost_days, days, crop_types)
+
+# Soil measurements and the nested soilData group each one lives in
+SOIL_FIELDS = {
+    'nitrogen': 'nutrients',
+    'phosphorus': 'nutrients',
+    'potassium': 'nutrients',
+    'organicMatter': 'structure',
+    'compaction': 'structure',
+    'microbialActivity': 'biology',
+    'earthworms': 'biology'
+}
+
+def _tiers(values, thresholds, points, above=True):
+    """
+    Award the points of the first tier a value passes; missing (NaN) scores 0
+    """
+    score = np.zeros(values.shape, dtype=np.int64)
+    # Apply the lowest tier first so higher tiers overwrite it
+    for threshold, tier_points in reversed(list(zip(thresholds, points))):
+        passed = values > threshold if above else values < threshold
+        score[passed] = tier_points
+    return score
+
+def soil_columns(soil_samples):
+    """
+    Convert a list of soilData dicts into columns, with NaN for missing values
+    """
+    return {
+        field: np.array([sample.get(group, {}).get(field, np.nan) for sample in soil_samples], dtype=np.float64)
+        for field, group in SOIL_FIELDS.items()
+    }
+
+def score_soil_batch(columns, masks=None):
+    """
+    Assess soil health for every cell of a soil-sampling grid
+
+    columns maps each SOIL_FIELDS name to a 1-D array of cell values; a
+    missing column or a NaN value counts as not measured. masks optionally
+    maps field names to boolean arrays that are False where the value is
+    missing. Per-cell results are identical to assess_soil_health.
+    """
+    cells = len(next(iter(columns.values()))) if columns else 0
+    values = {}
+    for field in SOIL_FIELDS:
+        column = np.asarray(columns.get(field, np.full(cells, np.nan)), dtype=np.float64)
+        if masks is not None and field in masks:
+            column = np.where(masks[field], column, np.nan)
+        values[field] = column
+
+    nutrient_score = np.minimum(100,
+        _tiers(values['nitrogen'], (80, 50, 30), (30, 20, 10)) +
+        _tiers(values['phosphorus'], (70, 40, 20), (25, 15, 8)) +
+        _tiers(values['potassium'], (75, 45, 25), (25, 15, 8)))
+    structure_score = np.minimum(100,
+        _tiers(values['organicMatter'], (3, 2, 1), (35, 25, 15)) +
+        _tiers(values['compaction'], (20, 40, 60), (30, 20, 10), above=False))
+    biological_score = np.minimum(100,
+        _tiers(values['microbialActivity'], (70, 50, 30), (40, 30, 20)) +
+        _tiers(values['earthworms'], (60, 40, 20), (30, 20, 10)))
+
+    overall_health = (nutrient_score * 0.3) + (structure_score * 0.3) + (biological_score * 0.4)
+
+    return {
+        'overall': overall_health,
+        'factors': {
+            'nutrients': nutrient_score,
+            'structure': structure_score,
+            'biology': biological_score
+        }
+    }
+
+def aggregate_soil_by_farm(soil_scores, farm_ids):
+    """
+    Summarize per-cell soil scores for each farm
+
+    farm_ids gives the farm of every cell. Returns the distinct farm ids and,
+    per farm, the cell count plus mean/min/max/std of the overall score and
+    the mean of each factor.
+    """
+    farms, farm_index = np.unique(np.asarray(farm_ids), return_inverse=True)
+    counts = np.bincount(farm_index, minlength=len(farms))
+
+    overall = soil_scores['overall']
+    mean = np.bincount(farm_index, weights=overall, minlength=len(farms)) / counts
+    variance = np.bincount(farm_index, weights=(overall - mean[farm_index]) ** 2, minlength=len(farms)) / counts
+
+    minimum = np.full(len(farms), np.inf)
+    maximum = np.full(len(farms), -np.inf)
+    np.minimum.at(minimum, farm_index, overall)
+    np.maximum.at(maximum, farm_index, overall)
+
+    return {
+        'farms': farms,
+        'cells': counts,
+        'overall': {
+            'mean': mean,
+            'min': minimum,
+            'max': maximum,
+            'std': np.sqrt(variance)
+        },
+        'factors': {
+            name: np.bincount(farm_index, weights=scores, minlength=len(farms)) / counts
+            for name, scores in soil_scores['factors'].items()
+        }
+    }
+
+def risk_at(batch, farm, crop):
+    """
+    Extract the disease/pest/climate dicts for one farm and crop of a batch result
+    """
+    return {
+        family: {
+            'overall': float(scores['overall'][farm, crop]),
+            'factors': {name: float(values[farm, crop]) for name, values in scores['factors'].items()}
+        }
+        for family, scores in batch.items()
+    }
+
+def assess_farms(farms):
+    """
+    Generate risk assessments for a list of farm records in batched passes
+
+    Farms are grouped by weather window length and each group is scored in
+    one pass over the union of its crop types. The output matches calling
+    assess_farm on every record.
+    """
+    assessments = [None] * len(farms)
+
+    groups = {}
+    for index, farm in enumerate(farms):
+        groups.setdefault(len(farm.get('weatherData', [])), []).append(index)
+
+    for indices in groups.values():
+        group = [farms[i] for i in indices]
+        crop_types = list(dict.fromkeys(
+            crop.get('type', '') for farm in group for crop in farm.get('crops', [])
+        ))
+        crop_index = {crop_type: i for i, crop_type in enumerate(crop_types)}
+        batch = score_weather_batch(*weather_columns(group), crop_types, *extreme_columns(group))
+        soil = score_soil_batch(soil_columns([farm.get('soilData', {}) for farm in group]))
+
+        for row, (i, farm) in enumerate(zip(indices, group)):
+            crop_risks = {}
+            for crop in farm.get('crops', []):
+                crop_type = crop.get('type', '')
+                crop_risks[crop_type] = risk_at(batch, row, crop_index[crop_type])
+
+            assessments[i] = {
+                'cropRisks': crop_risks,
+                'soilHealth': {
+                    'overall': float(soil['overall'][row]),
+                    'factors': {name: int(scores[row]) for name, scores in soil['factors'].items()}
+                },
+                'timestamp': datetime.now().isoformat(),
+                'overallRisk': {
+                    'disease': max([risk['disease']['overall'] for crop, risk in crop_risks.items()]),
+                    'pest': max([risk['pest']['overall'] for crop, risk in crop_risks.items()]),
+                    'climate': max([risk['climate']['overall'] for crop, risk in crop_risks.items()])
+                }
+            }
+
+    return assessments
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Benchmark Suite
+
+Reproducible throughput benchmarks for the risk and recommendation
+pipeline. Synthetic farms and catalogs are generated from a fixed seed and
+every stage is timed over a sweep of weather days, crops per farm, catalog
+size and batch size. Results are written as JSON and can be compared with a
+stored baseline run to flag regressions.
+
+Usage:
+    python3 benchmark.py --output baseline.json
+    python3 benchmark.py --compare baseline.json [--threshold 0.2]
+    python3 benchmark.py --quick
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+from datetime import datetime
+
+import risk_assessment
+from risk_assessment import assess_farm, assess_soil_health, summarize_weather
+from recommendations import generate_recommendations, get_application_timing, get_product_score
+from weather_series import parse_farm_json
+
+try:
+    from batch_scoring import assess_farms
+except ImportError:
+    # The NumPy batch engine is benchmarked only where NumPy is installed
+    assess_farms = None
+
+CROP_TYPES = ['Cotton', 'Chickpea', 'Wheat', 'Rice', 'Corn', 'Soybean', 'Vegetables']
+PRODUCT_TYPES = ['Pest Control', 'Disease Control', 'Soil Health', 'Growth Promoter']
+
+SWEEPS = {
+    'days': [14, 90, 365],
+    'crops': [1, 3, 7],
+    'catalog': [6, 1000, 10000],
+    'batch': [1, 100, 1000]
+}
+QUICK_SWEEPS = {
+    'days': [14, 90],
+    'crops': [1, 3],
+    'catalog': [6, 1000],
+    'batch': [1, 100]
+}
+
+def make_weather(rng, days):
+    """
+    Generate a synthetic daily weather window
+    """
+    return [
+        {
+            'temperature': round(rng.uniform(5, 42), 1),
+            'humidity': round(rng.uniform(30, 100), 1),
+            'rainfall': round(rng.choice([0, 0, 0, 0.5, 1.5, 3, 7, 12, 25, 35, 60]) * rng.random(), 1)
+        }
+        for _ in range(days)
+    ]
+
+def make_soil(rng):
+    """
+    Generate a synthetic soilData record
+    """
+    return {
+        'nutrients': {'nitrogen': rng.randint(10, 100), 'phosphorus': rng.randint(10, 100),
+                      'potassium': rng.randint(10, 100)},
+        'structure': {'organicMatter': round(rng.uniform(0.5, 4), 1), 'compaction': rng.randint(5, 80)},
+        'biology': {'microbialActivity': rng.randint(10, 100), 'earthworms': rng.randint(5, 80)}
+    }
+
+def make_farm(rng, days, crops):
+    """
+    Generate a synthetic farm record
+    """
+    return {
+        'weatherData': make_weather(rng, days),
+        'soilData': make_soil(rng),
+        'crops': [{'type': crop_type} for crop_type in rng.sample(CROP_TYPES, crops)]
+    }
+
+def make_catalog(rng, size):
+    """
+    Generate a synthetic product catalog
+    """
+    return [
+        {
+            'id': product_id,
+            'name': f"Product {product_id}",
+            'type': rng.choice(PRODUCT_TYPES),
+            'efficacy': rng.randint(50, 99),
+            'compatibility': ['All crops'] if rng.random() < 0.05 else rng.sample(CROP_TYPES, rng.randint(1, 3))
+        }
+        for product_id in range(size)
+    ]
+
+def measure(function, repeat, items=1):
+    """
+    Time function() repeat times and return per-item statistics in seconds
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - start) / items)
+    median = statistics.median(timings)
+    return {
+        'median': median,
+        'min': min(timings),
+        'itemsPerSecond': 1 / median if median else None
+    }
+
+def run_benchmarks(sweeps, repeat, seed):
+    """
+    Run every stage over its parameter sweep and return the result rows
+    """
+    results = []
+
+    def record(stage, params, stats):
+        results.append({'stage': stage, 'params': params, **stats})
+        print(f"{stage:28} {json.dumps(params):42} {stats['median'] * 1e6:12.1f} us/item", file=sys.stderr)
+
+    # Weather calculators and the fused reducer, over window length and crop count
+    for days in sweeps['days']:
+        for crops in sweeps['crops']:
+            rng = random.Random(seed)
+            farm = make_farm(rng, days, crops)
+            weather_data = farm['weatherData']
+            crop_types = [crop['type'] for crop in farm['crops']]
+            params = {'days': days, 'crops': crops}
+
+            for name in ('calculate_disease_risk', 'calculate_pest_risk', 'calculate_climate_stress'):
+                calculator = getattr(risk_assessment, name)
+                record(name, params, measure(
+                    lambda: [calculator(weather_data, crop_type) for crop_type in crop_types], repeat))
+            record('summarize_weather', params, measure(lambda: summarize_weather(weather_data), repeat))
+            record('assess_farm', params, measure(lambda: assess_farm(farm), repeat))
+
+    rng = random.Random(seed)
+    soil_data = make_soil(rng)
+    record('assess_soil_health', {}, measure(lambda: assess_soil_health(soil_data), repeat))
+
+    # Recommendation stages, over catalog size
+    rng = random.Random(seed)
+    farm = make_farm(rng, 14, 3)
+    risk = assess_farm(farm)
+    crop_type = farm['crops'][0]['type']
+    for size in sweeps['catalog']:
+        products = make_catalog(random.Random(seed), size)
+        params = {'catalog': size}
+        record('get_product_score', params, measure(
+            lambda: [get_product_score(product, crop_type, risk) for product in products], repeat, size))
+        record('get_application_timing', params, measure(
+            lambda: [get_application_timing(product, crop_type, risk) for product in products], repeat, size))
+        record('generate_recommendations', params, measure(
+            lambda: generate_recommendations(farm, risk, products), repeat))
+
+    # Serialization and batch scoring, over batch size
+    for batch in sweeps['batch']:
+        rng = random.Random(seed)
+        farms = [make_farm(rng, 14, 3) for _ in range(batch)]
+        lines = [json.dumps(farm) for farm in farms]
+        assessments = [assess_farm(farm) for farm in farms]
+        params = {'batch': batch}
+        record('json_decode', params, measure(lambda: [json.loads(line) for line in lines], repeat, batch))
+        record('parse_farm_json', params, measure(lambda: [parse_farm_json(line) for line in lines], repeat, batch))
+        record('json_encode', params, measure(lambda: [json.dumps(result) for result in assessments], repeat, batch))
+        if assess_farms is not None:
+            record('assess_farms_batch', params, measure(lambda: assess_farms(farms), repeat, batch))
+
+    # Interpreter startup plus one assessment, as paid by a spawned script
+    with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as f:
+        json.dump(make_farm(random.Random(seed), 14, 3), f)
+    try:
+        script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'risk_assessment.py')
+        record('process_startup', {}, measure(
+            lambda: subprocess.run([sys.executable, script, f.name], check=True, stdout=subprocess.DEVNULL),
+            max(1, repeat // 10)))
+    finally:
+        os.unlink(f.name)
+
+    return results
+
+def result_key(result):
+    return f"{result['stage']} {json.dumps(result['params'], sort_keys=True)}"
+
+def compare_results(results, baseline, threshold):
+    """
+    Return the results that are slower than the baseline by more than threshold
+    """
+    baseline_medians = {result_key(result): result['median'] for result in baseline['results']}
+    regressions = []
+    for result in results:
+        previous = baseline_medians.get(result_key(result))
+        if previous and result['median'] > previous * (1 + threshold):
+            regressions.append({
+                'stage': result['stage'],
+                'params': result['params'],
+                'baseline': previous,
+                'current': result['median'],
+                'slowdown': result['median'] / previous
+            })
+    return regressions
+
+def main():
+    """
+    Main function to run the benchmarks and record or compare a baseline
+    """
+    parser = argparse.ArgumentParser(description='Benchmark the risk and recommendation pipeline')
+    parser.add_argument('--output', help='Write results as JSON to this file (default: stdout)')
+    parser.add_argument('--compare', help='Baseline JSON from an earlier run to check for regressions')
+    parser.add_argument('--threshold', type=float, default=0.2, help='Allowed slowdown before flagging (0.2 = 20%%)')
+    parser.add_argument('--repeat', type=int, default=20, help='Timed runs per measurement')
+    parser.add_argument('--seed', type=int, default=1, help='Seed for the synthetic data generators')
+    parser.add_argument('--quick', action='store_true', help='Run a reduced parameter sweep')
+    args = parser.parse_args()
+
+    sweeps = QUICK_SWEEPS if args.quick else SWEEPS
+    results = run_benchmarks(sweeps, args.repeat, args.seed)
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'seed': args.seed,
+            'repeat': args.repeat,
+            'sweeps': sweeps
+        },
+        'results': results
+    }
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+        report['regressions'] = compare_results(results, baseline, args.threshold)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    for regression in report.get('regressions', []):
+        print(f"REGRESSION {regression['stage']} {json.dumps(regression['params'])}: "
+              f"{regression['slowdown']:.2f}x slower than baseline", file=sys.stderr)
+    if report.get('regressions'):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Crop Parameter Registry
+
+This module loads the per-crop temperature limits in stress_buster.csv once
+and compiles them, together with the crop-specific risk multipliers, into
+dense arrays indexed by crop ID. Scoring code resolves a crop name to its ID
+once and then reads every crop parameter with a table lookup, so adding
+crops adds rows rather than branches.
+
+Crop ID 0 is the default row used for crops without specific parameters:
+all multipliers are 1.0 and temperature limits are NaN (not applicable).
+"""
+
+import os
+import csv
+import math
+import functools
+from array import array
+
+STRESS_BUSTER_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'stress_buster.csv')
+
+# Crop-specific multipliers applied to the normalized risk factors
+CROP_ADJUSTMENTS = {
+    'cotton': {
+        # More susceptible to disease in humid conditions
+        'diseaseHumidity': 1.2,
+        # Particularly susceptible to aphids and bollworms
+        'pestTemperature': 1.3,
+        # Relatively drought-tolerant but sensitive to waterlogging
+        'climateDrought': 0.8,
+        'climateFlood': 1.2
+    },
+    'chickpea': {
+        # More susceptible to disease in wet conditions
+        'diseaseRainfall': 1.3,
+        # Specific pest pressures
+        'pestHumidity': 1.1,
+        # Sensitive to heat during flowering
+        'climateHeat': 1.3
+    }
+}
+
+MULTIPLIERS = (
+    'diseaseHumidity', 'diseaseTemperature', 'diseaseRainfall',
+    'pestTemperature', 'pestHumidity',
+    'climateHeat', 'climateDrought', 'climateFlood'
+)
+
+LIMITS = ('TMaxOptimum', 'TMaxLimit', 'TMinOptimum', 'TMinLimit', 'TMinNoFrost', 'TMinFrost')
+
+def _parse_limit(value):
+    value = value.strip()
+    return float('nan') if value in ('', 'NA') else float(value)
+
+def load_crop_limits(csv_path=STRESS_BUSTER_CSV):
+    """
+    Read the temperature limits per crop from stress_buster.csv
+    """
+    limits = {}
+    with open(csv_path, 'r', newline='') as f:
+        for row in csv.DictReader(f):
+            limits[row['Crop'].strip().lower()] = {name: _parse_limit(row[name]) for name in LIMITS}
+    return limits
+
+def compile_registry(crop_limits, crop_adjustments=CROP_ADJUSTMENTS):
+    """
+    Compile crop limits and multipliers into dense per-crop arrays
+
+    Heat and frost limits are also mapped to positions in sorted threshold
+    tables, so day counts for every crop can be read off one histogram of
+    the weather.
+    """
+    names = ['default'] + sorted(set(crop_limits) | set(crop_adjustments))
+    registry = {
+        'names': names,
+        'ids': {name: crop_id for crop_id, name in enumerate(names)}
+    }
+
+    for name in MULTIPLIERS:
+        registry[name] = array('d', (crop_adjustments.get(crop, {}).get(name, 1.0) for crop in names))
+    for name in LIMITS:
+        registry[name] = array('d', (crop_limits.get(crop, {}).get(name, math.nan) for crop in names))
+
+    # Sorted distinct thresholds; crops without a limit map to position -1
+    heat_thresholds = sorted({value for name in ('TMaxOptimum', 'TMaxLimit')
+                              for value in registry[name] if not math.isnan(value)})
+    frost_thresholds = sorted({value for value in registry['TMinFrost'] if not math.isnan(value)})
+    registry['heatThresholds'] = heat_thresholds
+    registry['frostThresholds'] = frost_thresholds
+    registry['heatOptimumIndex'] = array('i', (-1 if math.isnan(value) else heat_thresholds.index(value)
+                                                for value in registry['TMaxOptimum']))
+    registry['heatLimitIndex'] = array('i', (-1 if math.isnan(value) else heat_thresholds.index(value)
+                                              for value in registry['TMaxLimit']))
+    registry['frostIndex'] = array('i', (-1 if math.isnan(value) else frost_thresholds.index(value)
+                                          for value in registry['TMinFrost']))
+    return registry
+
+REGISTRY = compile_registry(load_crop_limits())
+
+@functools.lru_cache(maxsize=1024)
+def crop_id(crop_type):
+    """
+    Resolve a crop name (any case) to its row in the registry arrays
+    """
+    return REGISTRY['ids'].get(crop_type.lower(), 0)
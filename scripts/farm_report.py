@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Farm Report Script
+
+This script runs the risk assessment and the product recommendations for a
+farm in one pass. The in-memory risk assessment is handed straight to
+generate_recommendations, so a dashboard load costs one process (or one
+worker request) and one JSON round trip instead of two, and the risk
+structure is never serialized and parsed in between.
+
+Usage:
+    python3 farm_report.py input.json
+    python3 farm_report.py --ndjson [input.ndjson]
+
+The response holds both results:
+    {"riskAssessment": {...}, "recommendations": [...], "timestamp": "..."}
+"""
+
+import os
+import sys
+import json
+import argparse
+import functools
+from datetime import datetime
+
+from batch_runner import DEFAULT_CHUNK_SIZE, run_ndjson
+from risk_assessment import assess_farm, decode_farm
+from recommendations import DEFAULT_TOP_K, generate_recommendations, resolve_products
+from application_schedule import application_calendar
+from product_catalog import open_catalog
+from metrics import NULL_METRICS, Metrics
+from wire_formats import JSON_CODEC, TEXT_CODEC_NAMES, get_codec
+
+def farm_report(farm_data, products=None, top_k=DEFAULT_TOP_K, cache=None, metrics=NULL_METRICS,
+                product_ids=False, calendar_weeks=0):
+    """
+    Assess one farm and recommend products for it from the same in-memory assessment
+
+    products may be a list of product dicts or a compiled ProductCatalog;
+    the built-in catalog is used when it is omitted. cache is an optional
+    ResultCache for the risk assessment. With product_ids, recommendations
+    carry 'productId' instead of the full product. With calendar_weeks, a
+    week-by-week application 'calendar' is added.
+    """
+    products, index = resolve_products(products, metrics)
+    risk_assessment = assess_farm(farm_data, cache, metrics)
+    recommendations = generate_recommendations(farm_data, risk_assessment, products, index, top_k, metrics,
+                                               product_ids)
+
+    report = {
+        'riskAssessment': risk_assessment,
+        'recommendations': recommendations,
+        'timestamp': datetime.now().isoformat()
+    }
+    if calendar_weeks:
+        report['calendar'] = application_calendar(recommendations, weeks=calendar_weeks)
+    return report
+
+def report_line(line_number, line, top_k=DEFAULT_TOP_K, catalog_path=None, with_metrics=False,
+                codec=JSON_CODEC, product_ids=False, calendar_weeks=0):
+    """
+    Build the report for one NDJSON farm record and return the JSON output
+    line, or an error line if the record is bad
+    """
+    if not line.strip():
+        return None
+    metrics = Metrics() if with_metrics else NULL_METRICS
+    try:
+        products = open_catalog(catalog_path) if catalog_path else None
+        with metrics.stage('parse'):
+            farm_data = decode_farm(line, codec)
+        result = farm_report(farm_data, products, top_k, metrics=metrics, product_ids=product_ids,
+                             calendar_weeks=calendar_weeks)
+    except Exception as e:
+        result = {"error": str(e), "line": line_number}
+    if with_metrics:
+        result['metrics'] = metrics.to_dict()
+    return codec.dumps(result)
+
+def main():
+    """
+    Main function to assess farm data and recommend products in one run
+    """
+    parser = argparse.ArgumentParser(description='Assess crop risks and recommend products for farm data')
+    parser.add_argument('input_file', nargs='?', help='Farm data JSON file (NDJSON with --ndjson, "-" for stdin)')
+    parser.add_argument('--ndjson', action='store_true', help='Stream newline-delimited farm records, one result per line')
+    parser.add_argument('--workers', type=int, default=0, help='Shard --ndjson records across N worker processes')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='Records sent to a worker at a time')
+    parser.add_argument('--top-k', type=int, default=DEFAULT_TOP_K, help='Recommendations kept per crop')
+    parser.add_argument('--catalog', default=os.environ.get('PRODUCT_CATALOG'),
+                        help='Compiled product catalog (defaults to $PRODUCT_CATALOG, else the built-in list)')
+    parser.add_argument('--metrics', action='store_true',
+                        help='Add per-stage timings, counters and peak memory as a "metrics" block')
+    parser.add_argument('--codec', choices=TEXT_CODEC_NAMES, default='json',
+                        help='JSON codec for reading and writing records (auto picks orjson when installed)')
+    parser.add_argument('--product-ids', action='store_true',
+                        help='Return product IDs instead of embedding full product objects')
+    parser.add_argument('--calendar-weeks', type=int, default=0,
+                        help='Add a week-by-week application calendar covering N weeks')
+    args = parser.parse_args()
+
+    if args.workers and not args.ndjson:
+        parser.error('--workers requires --ndjson')
+
+    try:
+        codec = get_codec(args.codec)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.ndjson:
+        process_line = functools.partial(report_line, top_k=args.top_k, catalog_path=args.catalog,
+                                         with_metrics=args.metrics, codec=codec, product_ids=args.product_ids,
+                                         calendar_weeks=args.calendar_weeks)
+        run_ndjson(process_line, args.input_file or '-', args.workers, args.chunk_size)
+        return
+
+    if args.input_file is None:
+        print(json.dumps({"error": "No input file provided"}))
+        sys.exit(1)
+
+    metrics = Metrics() if args.metrics else NULL_METRICS
+
+    try:
+        with metrics.stage('parse'):
+            with open(args.input_file, 'r') as f:
+                farm_data = decode_farm(f.read(), codec)
+
+        products = open_catalog(args.catalog) if args.catalog else None
+        result = farm_report(farm_data, products, args.top_k, metrics=metrics, product_ids=args.product_ids,
+                             calendar_weeks=args.calendar_weeks)
+
+        if metrics.enabled:
+            result['metrics'] = metrics.to_dict()
+
+        print(codec.dumps(result))
+    except Exception as e:
+        print(json.dumps({"error": str(e)}))
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
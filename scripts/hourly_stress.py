@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Hourly Stress Engine
+
+This module scores hourly temperature forecasts against each crop's limits
+in stress_buster.csv: hours above TMaxOptimum and TMaxLimit, hours below
+TMinFrost, and degree-days accumulated above a base temperature (capped at
+TMaxOptimum). Series are held as (fields x hours) NumPy arrays, so a 16-day
+hourly forecast for thousands of fields is scored in a few array passes.
+
+Usage:
+    python3 hourly_stress.py input.json
+    python3 hourly_stress.py --ndjson [input.ndjson]
+
+Each farm record carries 'crops' and 'hourlyForecast', either a list of
+temperatures or the CE-Hub ShortRangeForecastHourly records.
+"""
+
+import sys
+import json
+import argparse
+from datetime import datetime
+
+import numpy as np
+
+from batch_runner import DEFAULT_CHUNK_SIZE, run_ndjson
+from crop_params import REGISTRY, crop_id
+
+# CE-Hub measure holding the hourly air temperature
+HOURLY_TEMPERATURE_LABEL = 'TempAir_Hourly (C)'
+
+# Base temperature for degree-day accumulation
+DEFAULT_BASE_TEMPERATURE = 10.0
+
+HOURS_PER_DAY = 24
+
+def parse_hourly_temperatures(forecast, measure_label=HOURLY_TEMPERATURE_LABEL):
+    """
+    Turn an hourly forecast into a float64 array ordered by time
+
+    Accepts a plain list of temperatures, or CE-Hub records with 'date',
+    'measureLabel' and 'value' keys (other measures are ignored).
+    """
+    if not forecast or not isinstance(forecast[0], dict):
+        return np.asarray(forecast, dtype=np.float64)
+
+    records = [record for record in forecast if record.get('measureLabel', measure_label) == measure_label]
+    records.sort(key=lambda record: record.get('date', ''))
+    return np.fromiter((float(record['value']) for record in records), dtype=np.float64, count=len(records))
+
+def score_hourly_batch(temperatures, crop_types, base_temperature=DEFAULT_BASE_TEMPERATURE):
+    """
+    Calculate hourly heat/frost exposure and degree-days for every field and crop
+
+    temperatures is a (fields x hours) array starting at midnight. Hour
+    counts and degree-days are (fields x crops) arrays; cumulativeDegreeDays
+    is (fields x crops x days), one running total per forecast day. Crops
+    without a limit in stress_buster.csv count zero hours for it, and their
+    degree-days are uncapped.
+    """
+    temperatures = np.asarray(temperatures, dtype=np.float64)
+    if temperatures.ndim == 1:
+        temperatures = temperatures[None, :]
+    fields, hours = temperatures.shape
+    day_starts = np.arange(0, hours, HOURS_PER_DAY)
+
+    heat_hours = np.zeros((fields, len(crop_types)), dtype=np.int64)
+    severe_heat_hours = np.zeros_like(heat_hours)
+    frost_hours = np.zeros_like(heat_hours)
+    cumulative_degree_days = np.zeros((fields, len(crop_types), len(day_starts)), dtype=np.float64)
+
+    # Crops loop over a handful of limits; the hours axis stays vectorized
+    for column, crop_type in enumerate(crop_types):
+        crop = crop_id(crop_type)
+        optimum = REGISTRY['TMaxOptimum'][crop]
+        limit = REGISTRY['TMaxLimit'][crop]
+        frost = REGISTRY['TMinFrost'][crop]
+
+        # Comparisons against NaN are False, so missing limits count zero hours
+        heat_hours[:, column] = (temperatures > optimum).sum(axis=1)
+        severe_heat_hours[:, column] = (temperatures > limit).sum(axis=1)
+        frost_hours[:, column] = (temperatures < frost).sum(axis=1)
+
+        capped = temperatures if np.isnan(optimum) else np.minimum(temperatures, optimum)
+        hourly_degree_days = np.maximum(capped - base_temperature, 0) / HOURS_PER_DAY
+        if hours:
+            daily = np.add.reduceat(hourly_degree_days, day_starts, axis=1)
+            cumulative_degree_days[:, column, :] = np.cumsum(daily, axis=1)
+
+    degree_days = cumulative_degree_days[:, :, -1] if len(day_starts) else np.zeros(heat_hours.shape)
+
+    return {
+        'heatHours': heat_hours,
+        'severeHeatHours': severe_heat_hours,
+        'frostHours': frost_hours,
+        'degreeDays': degree_days,
+        'cumulativeDegreeDays': cumulative_degree_days
+    }
+
+def assess_hourly(farm_data, base_temperature=DEFAULT_BASE_TEMPERATURE):
+    """
+    Generate the hourly stress assessment for one farm record
+    """
+    temperatures = parse_hourly_temperatures(farm_data.get('hourlyForecast', []))
+    crop_types = [crop.get('type', '') for crop in farm_data.get('crops', [])]
+    batch = score_hourly_batch(temperatures, crop_types, base_temperature)
+
+    return {
+        'hourlyStress': {
+            crop_type: {
+                'heatHours': int(batch['heatHours'][0, column]),
+                'severeHeatHours': int(batch['severeHeatHours'][0, column]),
+                'frostHours': int(batch['frostHours'][0, column]),
+                'degreeDays': float(batch['degreeDays'][0, column]),
+                'cumulativeDegreeDays': batch['cumulativeDegreeDays'][0, column].tolist()
+            }
+            for column, crop_type in enumerate(crop_types)
+        },
+        'hours': len(temperatures),
+        'timestamp': datetime.now().isoformat()
+    }
+
+def assess_hourly_line(line_number, line):
+    """
+    Assess one NDJSON farm record, returning an error line if it is bad
+    """
+    if not line.strip():
+        return None
+    try:
+        result = assess_hourly(json.loads(line))
+    except Exception as e:
+        result = {"error": str(e), "line": line_number}
+    return json.dumps(result)
+
+def main():
+    """
+    Main function to score hourly forecasts for farm data
+    """
+    parser = argparse.ArgumentParser(description='Score hourly heat and frost stress for farm data')
+    parser.add_argument('input_file', nargs='?', help='Farm data JSON file (NDJSON with --ndjson, "-" for stdin)')
+    parser.add_argument('--ndjson', action='store_true', help='Stream newline-delimited farm records, one result per line')
+    parser.add_argument('--workers', type=int, default=0, help='Shard --ndjson records across N worker processes')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='Records sent to a worker at a time')
+    args = parser.parse_args()
+
+    if args.workers and not args.ndjson:
+        parser.error('--workers requires --ndjson')
+
+    if args.ndjson:
+        run_ndjson(assess_hourly_line, args.input_file or '-', args.workers, args.chunk_size)
+        return
+
+    if args.input_file is None:
+        print(json.dumps({"error": "No input file provided"}))
+        sys.exit(1)
+
+    try:
+        with open(args.input_file, 'r') as f:
+            farm_data = json.load(f)
+        print(json.dumps(assess_hourly(farm_data)))
+    except Exception as e:
+        print(json.dumps({"error": str(e)}))
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Scoring Metrics
+
+Optional hot-path instrumentation for the scoring scripts: wall time and
+call counts per stage, named counters (records, cache hits, products
+scored) and the process's peak resident memory. Metrics are returned as a
+'metrics' block in the JSON response, or rendered as Prometheus text and
+served on a local port by the worker.
+
+Instrumentation is off unless asked for. Code is written against
+NULL_METRICS by default, whose stage() hands back one shared no-op context
+manager and whose count() does nothing, so the disabled path costs a method
+call per stage and allocates nothing.
+"""
+
+import re
+import sys
+import time
+import threading
+import contextlib
+import http.server
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows; peak memory is then reported as None
+    resource = None
+
+def peak_memory_bytes():
+    """
+    Return the peak resident set size of this process in bytes
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+class _Stage:
+    """
+    Context manager adding the wall time of its block to one stage
+    """
+    __slots__ = ('metrics', 'name', 'start')
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.metrics.add_time(self.name, time.perf_counter() - self.start)
+        return False
+
+class Metrics:
+    """
+    Per-stage wall time and named counters for one request or one process
+
+    Not thread-safe on its own: give each request its own Metrics and merge
+    it into a shared one (merge() takes the lock) when the request is done.
+    """
+    enabled = True
+
+    def __init__(self):
+        self.stages = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    def stage(self, name):
+        """
+        Time a block: with metrics.stage('summarize_weather'): ...
+        """
+        return _Stage(self, name)
+
+    def add_time(self, name, seconds, calls=1):
+        """
+        Add wall time spent in a stage
+        """
+        totals = self.stages.get(name)
+        if totals is None:
+            self.stages[name] = [calls, seconds]
+        else:
+            totals[0] += calls
+            totals[1] += seconds
+
+    def count(self, name, amount=1):
+        """
+        Increase a named counter
+        """
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def merge(self, other):
+        """
+        Add another Metrics' stages and counters into this one
+        """
+        with self._lock:
+            for name, (calls, seconds) in other.stages.items():
+                self.add_time(name, seconds, calls)
+            for name, amount in other.counters.items():
+                self.count(name, amount)
+
+    def to_dict(self):
+        """
+        Return the metrics block for a JSON response
+        """
+        with self._lock:
+            return {
+                'stages': {
+                    name: {'calls': calls, 'seconds': seconds}
+                    for name, (calls, seconds) in self.stages.items()
+                },
+                'counters': dict(self.counters),
+                'peakMemoryBytes': peak_memory_bytes()
+            }
+
+    def to_prometheus(self, prefix='scoring'):
+        """
+        Render the metrics in the Prometheus text exposition format
+        """
+        with self._lock:
+            stages = list(self.stages.items())
+            counters = list(self.counters.items())
+
+        lines = [
+            f"# HELP {prefix}_stage_seconds_total Wall time spent in each scoring stage",
+            f"# TYPE {prefix}_stage_seconds_total counter"
+        ]
+        lines += [f'{prefix}_stage_seconds_total{{stage="{name}"}} {seconds:.9f}' for name, (_, seconds) in stages]
+        lines += [
+            f"# HELP {prefix}_stage_calls_total Times each scoring stage ran",
+            f"# TYPE {prefix}_stage_calls_total counter"
+        ]
+        lines += [f'{prefix}_stage_calls_total{{stage="{name}"}} {calls}' for name, (calls, _) in stages]
+        for name, amount in counters:
+            metric = f"{prefix}_{_snake_case(name)}_total"
+            lines += [f"# TYPE {metric} counter", f"{metric} {amount}"]
+
+        peak = peak_memory_bytes()
+        if peak is not None:
+            lines += [f"# TYPE {prefix}_peak_memory_bytes gauge", f"{prefix}_peak_memory_bytes {peak}"]
+        return '\n'.join(lines) + '\n'
+
+class NullMetrics:
+    """
+    Stand-in used when instrumentation is disabled
+    """
+    enabled = False
+
+    _STAGE = contextlib.nullcontext()
+
+    def stage(self, name):
+        return self._STAGE
+
+    def add_time(self, name, seconds, calls=1):
+        pass
+
+    def count(self, name, amount=1):
+        pass
+
+NULL_METRICS = NullMetrics()
+
+def _snake_case(name):
+    return re.sub(r'(?<!^)(?=[A-Z])', '_', name).lower()
+
+def serve_prometheus(metrics, port, host='127.0.0.1'):
+    """
+    Serve metrics.to_prometheus() at http://host:port/metrics from a
+    daemon thread and return the server
+    """
+    class MetricsHandler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != '/metrics':
+                self.send_error(404)
+                return
+            body = metrics.to_prometheus().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            # Keep scrapes out of the worker's stderr
+            pass
+
+    server = http.server.ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
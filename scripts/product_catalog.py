@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Product Catalog
+
+This module compiles the product catalog into a read-only SQLite file and
+serves it to recommendations.py. The file is opened with SQLite's
+memory-mapped I/O, so every worker process reads the same pages from the OS
+page cache instead of holding its own copy. Compatibility is stored as an
+indexed (crop, position) table, so only the candidates for a crop are ever
+decoded, and a catalog recompiled in place is picked up without a restart.
+Each product is decoded at most once per process: per-crop candidate lists
+hold references to the shared product dicts, so an 'All crops' product is
+not copied for every crop.
+
+Usage:
+    python3 product_catalog.py compile products.json catalog.db
+"""
+
+import os
+import sys
+import json
+import time
+import sqlite3
+import argparse
+import threading
+
+# Bytes of the catalog file SQLite may map into memory
+MMAP_SIZE = 256 * 1024 * 1024
+
+# Seconds between checks for a recompiled catalog file
+RELOAD_INTERVAL = 1.0
+
+# Candidate lists cached per crop before the cache is reset
+MAX_CACHED_CROPS = 1024
+
+def compile_catalog(products, catalog_path):
+    """
+    Write products to a compiled catalog file, replacing it atomically
+    """
+    temp_path = f"{catalog_path}.{os.getpid()}.tmp"
+    if os.path.exists(temp_path):
+        os.unlink(temp_path)
+
+    connection = sqlite3.connect(temp_path)
+    try:
+        connection.executescript('''
+            CREATE TABLE products (
+                position INTEGER PRIMARY KEY,
+                id INTEGER,
+                data TEXT NOT NULL
+            );
+            CREATE TABLE compatibility (
+                crop TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                PRIMARY KEY (crop, position)
+            ) WITHOUT ROWID;
+        ''')
+        connection.executemany(
+            'INSERT INTO products (position, id, data) VALUES (?, ?, ?)',
+            ((position, product.get('id'), json.dumps(product)) for position, product in enumerate(products))
+        )
+        connection.executemany(
+            'INSERT OR IGNORE INTO compatibility (crop, position) VALUES (?, ?)',
+            ((crop_type, position) for position, product in enumerate(products)
+             for crop_type in product['compatibility'])
+        )
+        connection.commit()
+    finally:
+        connection.close()
+
+    # Readers holding the old file keep their snapshot until they reload
+    os.replace(temp_path, catalog_path)
+
+class ProductCatalog:
+    """
+    Read-only view of a compiled catalog, reloaded when the file changes
+
+    Safe to share between threads. Open one per process (see open_catalog)
+    rather than inheriting a connection across fork.
+    """
+    def __init__(self, catalog_path, reload_interval=RELOAD_INTERVAL):
+        self.catalog_path = catalog_path
+        self.reload_interval = reload_interval
+        self._lock = threading.Lock()
+        self._connection = None
+        self._file_id = None
+        self._checked_at = 0.0
+        self._candidates = {}
+        self._rows = {}
+        self._open()
+
+    def _stat(self):
+        stat = os.stat(self.catalog_path)
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def _open(self):
+        file_id = self._stat()
+        connection = sqlite3.connect(f"file:{self.catalog_path}?mode=ro", uri=True, check_same_thread=False)
+        connection.execute(f'PRAGMA mmap_size = {MMAP_SIZE}')
+
+        if self._connection is not None:
+            self._connection.close()
+        self._connection = connection
+        self._file_id = file_id
+        self._checked_at = time.monotonic()
+        self._candidates = {}
+        self._rows = {}
+
+    def _reload_if_changed(self):
+        now = time.monotonic()
+        if now - self._checked_at < self.reload_interval:
+            return
+        self._checked_at = now
+        try:
+            changed = self._stat() != self._file_id
+        except FileNotFoundError:
+            # Keep serving the last good catalog while a new one is written
+            return
+        if changed:
+            self._open()
+
+    def _decode(self, rows):
+        """
+        Return the products for (position, data) rows, decoding each
+        position only the first time it is seen
+        """
+        products = []
+        for position, data in rows:
+            product = self._rows.get(position)
+            if product is None:
+                product = self._rows[position] = json.loads(data)
+            products.append(product)
+        return products
+
+    def compatible_products(self, crop_type):
+        """
+        Return the products compatible with a crop, in catalog order
+
+        The product dicts are shared with every other caller; treat them as
+        read-only.
+        """
+        with self._lock:
+            self._reload_if_changed()
+
+            candidates = self._candidates.get(crop_type)
+            if candidates is None:
+                rows = self._connection.execute(
+                    'SELECT position, data FROM products WHERE position IN '
+                    '(SELECT position FROM compatibility WHERE crop = ? OR crop = ?) '
+                    'ORDER BY position',
+                    (crop_type, 'All crops')
+                )
+                candidates = self._decode(rows)
+                if len(self._candidates) >= MAX_CACHED_CROPS:
+                    self._candidates = {}
+                self._candidates[crop_type] = candidates
+            return candidates
+
+    def products(self):
+        """
+        Return the full catalog, in catalog order
+        """
+        with self._lock:
+            self._reload_if_changed()
+            rows = self._connection.execute('SELECT position, data FROM products ORDER BY position')
+            return self._decode(rows)
+
+_open_catalogs = {}
+
+def open_catalog(catalog_path):
+    """
+    Return this process's shared ProductCatalog for a path
+    """
+    key = (os.path.abspath(catalog_path), os.getpid())
+    catalog = _open_catalogs.get(key)
+    if catalog is None:
+        catalog = _open_catalogs[key] = ProductCatalog(catalog_path)
+    return catalog
+
+def main():
+    """
+    Main function to compile a JSON product list into a catalog file
+    """
+    parser = argparse.ArgumentParser(description='Manage compiled product catalogs')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    compile_parser = subparsers.add_parser('compile', help='Compile a JSON product list')
+    compile_parser.add_argument('products_file', help='JSON file holding a list of products')
+    compile_parser.add_argument('catalog_file', help='Compiled catalog to write')
+    args = parser.parse_args()
+
+    try:
+        with open(args.products_file, 'r') as f:
+            products = json.load(f)
+        compile_catalog(products, args.catalog_file)
+        print(json.dumps({"products": len(products), "catalog": args.catalog_file}))
+    except Exception as e:
+        print(json.dumps({"error": str(e)}))
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -6,22 +6,143 @@ This script processes farm data and risk assessment to generate
 personalized recommendations for biological products.
 """
 
+import os
 import sys
 import json
 import math
-from datetime import datetime, timedelta
+import heapq
+import argparse
+import functools
+from operator import itemgetter
+from datetime import datetime
+
+from batch_runner import DEFAULT_CHUNK_SIZE, run_ndjson
+from product_catalog import ProductCatalog, open_catalog
+from metrics import NULL_METRICS, Metrics
+from wire_formats import JSON_CODEC, TEXT_CODEC_NAMES, get_codec
+from application_schedule import application_calendar, date_table, reference_day, schedule_timings, timing, window_days
+
+# Recommendations kept per crop
+DEFAULT_TOP_K = 3
+
+# Built-in demo catalog, used when no compiled catalog is configured
+# (see product_catalog.py for loading a real catalog from disk)
+PRODUCTS = [
+    {
+        'id': 1,
+        'name': 'BioDefend Plus',
+        'type': 'Pest Control',
+        'efficacy': 95,
+        'compatibility': ['Cotton', 'Chickpea'],
+        'applicationTiming': 'Apply during early flowering stage',
+        'benefits': ['Targets aphids specifically', 'Safe for pollinators', 'Residual protection for up to 14 days']
+    },
+    {
+        'id': 2,
+        'name': 'MildewGuard Bio',
+        'type': 'Disease Control',
+        'efficacy': 85,
+        'compatibility': ['Cotton', 'Chickpea', 'Wheat'],
+        'applicationTiming': 'Apply at first signs of disease or as preventative',
+        'benefits': ['Prevents and treats powdery mildew', 'Strengthens plant immune system', 'Rainfast within 1 hour']
+    },
+    {
+        'id': 3,
+        'name': 'SoilVital Pro',
+        'type': 'Soil Health',
+        'efficacy': 80,
+        'compatibility': ['All crops'],
+        'applicationTiming': 'Apply during field preparation or early growth stages',
+        'benefits': ['Increases nitrogen fixation', 'Improves nutrient uptake', 'Enhances soil structure']
+    },
+    {
+        'id': 4,
+        'name': 'BioRoot Stimulator',
+        'type': 'Growth Promoter',
+        'efficacy': 75,
+        'compatibility': ['All crops'],
+        'applicationTiming': 'Apply during early vegetative growth',
+        'benefits': ['Promotes root development', 'Increases drought tolerance', 'Enhances nutrient uptake']
+    },
+    {
+        'id': 5,
+        'name': 'NemControl Bio',
+        'type': 'Pest Control',
+        'efficacy': 80,
+        'compatibility': ['Cotton', 'Vegetables'],
+        'applicationTiming': 'Apply during field preparation or early growth stages',
+        'benefits': ['Controls nematodes naturally', 'Improves root health', 'Long-lasting protection']
+    },
+    {
+        'id': 6,
+        'name': 'BlightShield Organic',
+        'type': 'Disease Control',
+        'efficacy': 80,
+        'compatibility': ['Cotton', 'Vegetables'],
+        'applicationTiming': 'Apply preventatively or at first signs of disease',
+        'benefits': ['Controls multiple types of blight', 'Improves plant vigor', 'Eco-friendly formulation']
+    }
+]
+
+def build_product_index(products):
+    """
+    Compile the catalog into an inverted index from crop type to the
+    positions of compatible products, plus the products that suit all crops
+    """
+    by_crop = {}
+    universal = []
+    for position, product in enumerate(products):
+        if 'All crops' in product['compatibility']:
+            universal.append(position)
+            continue
+        for crop_type in dict.fromkeys(product['compatibility']):
+            by_crop.setdefault(crop_type, []).append(position)
+    
+    return {
+        'products': products,
+        'byCrop': by_crop,
+        'universal': universal,
+        # Candidate lists per crop, filled on first use; None holds crops
+        # that only match the universal products
+        'candidates': {None: [products[position] for position in universal]}
+    }
+
+def compatible_products(index, crop_type):
+    """
+    Return the products compatible with a crop, in catalog order
+
+    index is either a dict from build_product_index or a compiled
+    ProductCatalog.
+    """
+    if isinstance(index, ProductCatalog):
+        return index.compatible_products(crop_type)
+    
+    if crop_type not in index['byCrop']:
+        return index['candidates'][None]
+    
+    candidates = index['candidates'].get(crop_type)
+    if candidates is None:
+        # Both position lists are sorted, so merging keeps catalog order
+        positions = heapq.merge(index['byCrop'][crop_type], index['universal'])
+        candidates = [index['products'][position] for position in positions]
+        index['candidates'][crop_type] = candidates
+    return candidates
 
 def get_product_score(product, crop_type, risk_assessment):
     """
     Calculate a score for a product based on its suitability for the given crop and risks
     """
-    score = 0
-    
     # Check if the product is compatible with the crop
     if crop_type in product['compatibility'] or 'All crops' in product['compatibility']:
-        score += 30
+        return score_compatible_product(product, crop_type, risk_assessment)
     else:
         return 0  # Product is not compatible with this crop
+
+def score_compatible_product(product, crop_type, risk_assessment):
+    """
+    Calculate the score of a product already known to be compatible with the crop
+    """
+    score = 30
     
     # Get the risk factors for this crop
     crop_risks = risk_assessment['cropRisks'].get(crop_type, {})
@@ -55,88 +176,37 @@ def get_product_score(product, crop_type, risk_assessment):
 def get_application_timing(product, crop_type, risk_assessment, current_date=None):
     """
     Determine the optimal application timing for a product
+
+    current_date may be a date or a datetime; it defaults to now.
     """
-    if current_date is None:
-        current_date = datetime.now()
-    
-    # Default timing is within 7 days
-    timing = {
-        'window': 'Within 7 Days',
-        'urgency': 'Medium',
-        'date': (current_date + timedelta(days=7)).strftime('%Y-%m-%d')
-    }
-    
     # Get the risk factors for this crop
     crop_risks = risk_assessment['cropRisks'].get(crop_type, {})
     
-    # Adjust timing based on risk levels and product type
-    if product['type'] == 'Pest Control' and 'pest' in crop_risks:
-        pest_risk = crop_risks['pest']['overall']
-        if pest_risk > 80:
-            timing = {
-                'window': 'Next 3 Days',
-                'urgency': 'High',
-                'date': (current_date + timedelta(days=3)).strftime('%Y-%m-%d')
-            }
-        elif pest_risk > 60:
-            timing = {
-                'window': 'Within 5 Days',
-                'urgency': 'Medium-High',
-                'date': (current_date + timedelta(days=5)).strftime('%Y-%m-%d')
-            }
-    
-    elif product['type'] == 'Disease Control' and 'disease' in crop_risks:
-        disease_risk = crop_risks['disease']['overall']
-        if disease_risk > 80:
-            timing = {
-                'window': 'Next 3 Days',
-                'urgency': 'High',
-                'date': (current_date + timedelta(days=3)).strftime('%Y-%m-%d')
-            }
-        elif disease_risk > 60:
-            timing = {
-                'window': 'Within 5 Days',
-                'urgency': 'Medium-High',
-                'date': (current_date + timedelta(days=5)).strftime('%Y-%m-%d')
-            }
-    
-    elif product['type'] == 'Soil Health' and 'soilHealth' in risk_assessment:
-        soil_health = risk_assessment['soilHealth']['overall']
-        if soil_health < 40:
-            timing = {
-                'window': 'Within 10 Days',
-                'urgency': 'Medium',
-                'date': (current_date + timedelta(days=10)).strftime('%Y-%m-%d')
-            }
-        else:
-            timing = {
-                'window': 'Within 14 Days',
-                'urgency': 'Low',
-                'date': (current_date + timedelta(days=14)).strftime('%Y-%m-%d')
-            }
-    
-    elif product['type'] == 'Growth Promoter' and 'climate' in crop_risks:
-        climate_stress = crop_risks['climate']['overall']
-        if climate_stress > 70:
-            timing = {
-                'window': 'Within 5 Days',
-                'urgency': 'Medium-High',
-                'date': (current_date + timedelta(days=5)).strftime('%Y-%m-%d')
-            }
-        else:
-            timing = {
-                'window': 'Within 10 Days',
-                'urgency': 'Medium',
-                'date': (current_date + timedelta(days=10)).strftime('%Y-%m-%d')
-            }
-    
-    return timing
+    # Adjust timing based on risk levels and product type (see application_schedule.py)
+    days = window_days(product['type'], crop_risks, risk_assessment)
+    return timing(date_table(reference_day(current_date))[days])
 
-def generate_recommendations(farm_data, risk_assessment, products):
+def generate_recommendations(farm_data, risk_assessment, products, index=None, top_k=DEFAULT_TOP_K,
+                             metrics=NULL_METRICS, product_ids=False):
     """
     Generate personalized product recommendations based on farm data and risk assessment
+
+    Pass a prebuilt index from build_product_index, or a ProductCatalog, to
+    reuse it across calls. Only the top_k best-scoring products per crop are kept, and application
+    timing is worked out for those survivors alone. Pass a Metrics to record
+    per-stage wall time and counters. With product_ids, each recommendation
+    carries 'productId' instead of embedding the full product.
     """
-    recommendations = []
+    product_key = 'productId' if product_ids else 'product'
+    
+    # One reference date for every timing window in this response
+    now = datetime.now()
+    
+    if index is None:
+        with metrics.stage('index_build'):
+            index = build_product_index(products)
+    
+    crop_recommendations = []
     
     # Process each crop
     for crop in farm_data.get('crops', []):
@@ -146,114 +216,161 @@ def generate_recommendations(farm_data, risk_assessment, products):
         if crop_type not in risk_assessment['cropRisks']:
             continue
         
-        # Score each product for this crop
-        crop_recommendations = []
-        for product in products:
-            score = get_product_score(product, crop_type, risk_assessment)
-            if score > 0:
-                application_timing = get_application_timing(product, crop_type, risk_assessment)
-                crop_recommendations.append({
-                    'product': product,
-                    'score': score,
-                    'applicationTiming': application_timing,
-                    'cropType': crop_type
-                })
+        # Score each compatible product for this crop
+        with metrics.stage('product_scoring'):
+            candidates = compatible_products(index, crop_type)
+            scored = []
+            for product in candidates:
+                score = score_compatible_product(product, crop_type, risk_assessment)
+                if score > 0:
+                    scored.append((score, product))
+        metrics.count('productsScored', len(candidates))
         
-        # Sort recommendations by score (descending)
-        crop_recommendations.sort(key=lambda x: x['score'], reverse=True)
+        # Keep the top recommendations with a bounded heap (ties keep catalog order)
+        with metrics.stage('ranking'):
+            top = heapq.nlargest(top_k, scored, key=itemgetter(0))
         
-        # Add top recommendations
-        recommendations.extend(crop_recommendations[:3])
-    
-    # Sort all recommendations by score
-    recommendations.sort(key=lambda x: x['score'], reverse=True)
+        with metrics.stage('application_timing'):
+            timings = schedule_timings([(product, crop_type) for score, product in top], risk_assessment, now)
+            crop_recommendations.append([
+                {
+                    product_key: product['id'] if product_ids else product,
+                    'score': score,
+                    'applicationTiming': timing,
+                    'cropType': crop_type
+                }
+                for (score, product), timing in zip(top, timings)
+            ])
     
+    # Each crop's list is already sorted, so merge them by score
+    with metrics.stage('ranking'):
+        recommendations = list(heapq.merge(*crop_recommendations, key=itemgetter('score'), reverse=True))
+    metrics.count('recommendations', len(recommendations))
     return recommendations
 
+# Compiled once per process for the built-in catalog
+PRODUCT_INDEX = build_product_index(PRODUCTS)
+
+def resolve_products(products=None, metrics=NULL_METRICS):
+    """
+    Return the (products, index) pair to pass to generate_recommendations
+
+    products may be a list of product dicts or a compiled ProductCatalog;
+    the built-in catalog and its prebuilt index are used when it is omitted.
+    """
+    if products is None:
+        return PRODUCTS, PRODUCT_INDEX
+    if isinstance(products, ProductCatalog):
+        return products, products
+    with metrics.stage('index_build'):
+        return products, build_product_index(products)
+
+def recommend_products(input_data, products=None, top_k=DEFAULT_TOP_K, metrics=NULL_METRICS, product_ids=False,
+                       calendar_weeks=0):
+    """
+    Generate the recommendations response for one farm and its risk assessment
+
+    products may be a list of product dicts or a compiled ProductCatalog;
+    the built-in catalog is used when it is omitted. With calendar_weeks,
+    a week-by-week application 'calendar' is added to the response.
+    """
+    products, index = resolve_products(products, metrics)
+    
+    farm_data = input_data.get('farmData', {})
+    risk_assessment = input_data.get('riskAssessment', {})
+    metrics.count('records')
+    
+    # Generate recommendations
+    recommendations = generate_recommendations(farm_data, risk_assessment, products, index, top_k, metrics,
+                                               product_ids)
+    
+    response = {
+        'recommendations': recommendations,
+        'timestamp': datetime.now().isoformat()
+    }
+    if calendar_weeks:
+        response['calendar'] = application_calendar(recommendations, weeks=calendar_weeks)
+    return response
+
+def recommend_line(line_number, line, top_k=DEFAULT_TOP_K, catalog_path=None, with_metrics=False,
+                   codec=JSON_CODEC, product_ids=False, calendar_weeks=0):
+    """
+    Generate recommendations for one NDJSON {farmData, riskAssessment} record
+    and return the JSON output line, or an error line if the record is bad
+    """
+    if not line.strip():
+        return None
+    metrics = Metrics() if with_metrics else NULL_METRICS
+    try:
+        products = open_catalog(catalog_path) if catalog_path else None
+        with metrics.stage('parse'):
+            input_data = codec.loads(line)
+        result = recommend_products(input_data, products, top_k, metrics, product_ids, calendar_weeks)
+    except Exception as e:
+        result = {"error": str(e), "line": line_number}
+    if with_metrics:
+        result['metrics'] = metrics.to_dict()
+    return codec.dumps(result)
+
 def main():
     """
     Main function to process farm data and risk assessment to generate recommendations
     """
-    if len(sys.argv) < 2:
+    parser = argparse.ArgumentParser(description='Recommend biological products for farm data')
+    parser.add_argument('input_file', nargs='?', help='Input JSON file (NDJSON with --ndjson, "-" for stdin)')
+    parser.add_argument('--ndjson', action='store_true', help='Stream newline-delimited records, one result per line')
+    parser.add_argument('--workers', type=int, default=0, help='Shard --ndjson records across N worker processes')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='Records sent to a worker at a time')
+    parser.add_argument('--top-k', type=int, default=DEFAULT_TOP_K, help='Recommendations kept per crop')
+    parser.add_argument('--catalog', default=os.environ.get('PRODUCT_CATALOG'),
+                        help='Compiled product catalog (defaults to $PRODUCT_CATALOG, else the built-in list)')
+    parser.add_argument('--metrics', action='store_true',
+                        help='Add per-stage timings, counters and peak memory as a "metrics" block')
+    parser.add_argument('--codec', choices=TEXT_CODEC_NAMES, default='json',
+                        help='JSON codec for reading and writing records (auto picks orjson when installed)')
+    parser.add_argument('--product-ids', action='store_true',
+                        help='Return product IDs instead of embedding full product objects')
+    parser.add_argument('--calendar-weeks', type=int, default=0,
+                        help='Add a week-by-week application calendar covering N weeks')
+    args = parser.parse_args()
+    
+    if args.workers and not args.ndjson:
+        parser.error('--workers requires --ndjson')
+    
+    try:
+        codec = get_codec(args.codec)
+    except ValueError as e:
+        parser.error(str(e))
+    
+    if args.ndjson:
+        process_line = functools.partial(recommend_line, top_k=args.top_k, catalog_path=args.catalog,
+                                         with_metrics=args.metrics, codec=codec, product_ids=args.product_ids,
+                                         calendar_weeks=args.calendar_weeks)
+        run_ndjson(process_line, args.input_file or '-', args.workers, args.chunk_size)
+        return
+    
+    if args.input_file is None:
         print(json.dumps({"error": "No input file provided"}))
         sys.exit(1)
     
-    input_file = sys.argv[1]
+    input_file = args.input_file
+    
+    metrics = Metrics() if args.metrics else NULL_METRICS
     
     try:
-        with open(input_file, 'r') as f:
-            input_data = json.load(f)
+        with metrics.stage('parse'):
+            with open(input_file, 'r') as f:
+                input_data = codec.loads(f.read())
         
-        farm_data = input_data.get('farmData', {})
-        risk_assessment = input_data.get('riskAssessment', {})
+        products = open_catalog(args.catalog) if args.catalog else None
+        result = recommend_products(input_data, products, args.top_k, metrics, args.product_ids,
+                                    args.calendar_weeks)
         
-        # In a real application, products would be fetched from a database
-        # Here we're using a simplified list of products
-        products = [
-            {
-                'id': 1,
-                'name': 'BioDefend Plus',
-                'type': 'Pest Control',
-                'efficacy': 95,
-                'compatibility': ['Cotton', 'Chickpea'],
-                'applicationTiming': 'Apply during early flowering stage',
-                'benefits': ['Targets aphids specifically', 'Safe for pollinators', 'Residual protection for up to 14 days']
-            },
-            {
-                'id': 2,
-                'name': 'MildewGuard Bio',
-                'type': 'Disease Control',
-                'efficacy': 85,
-                'compatibility': ['Cotton', 'Chickpea', 'Wheat'],
-                'applicationTiming': 'Apply at first signs of disease or as preventative',
-                'benefits': ['Prevents and treats powdery mildew', 'Strengthens plant immune system', 'Rainfast within 1 hour']
-            },
-            {
-                'id': 3,
-                'name': 'SoilVital Pro',
-                'type': 'Soil Health',
-                'efficacy': 80,
-                'compatibility': ['All crops'],
-                'applicationTiming': 'Apply during field preparation or early growth stages',
-                'benefits': ['Increases nitrogen fixation', 'Improves nutrient uptake', 'Enhances soil structure']
-            },
-            {
-                'id': 4,
-                'name': 'BioRoot Stimulator',
-                'type': 'Growth Promoter',
-                'efficacy': 75,
-                'compatibility': ['All crops'],
-                'applicationTiming': 'Apply during early vegetative growth',
-                'benefits': ['Promotes root development', 'Increases drought tolerance', 'Enhances nutrient uptake']
-            },
-            {
-                'id': 5,
-                'name': 'NemControl Bio',
-                'type': 'Pest Control',
-                'efficacy': 80,
-                'compatibility': ['Cotton', 'Vegetables'],
-                'applicationTiming': 'Apply during field preparation or early growth stages',
-                'benefits': ['Controls nematodes naturally', 'Improves root health', 'Long-lasting protection']
-            },
-            {
-                'id': 6,
-                'name': 'BlightShield Organic',
-                'type': 'Disease Control',
-                'efficacy': 80,
-                'compatibility': ['Cotton', 'Vegetables'],
-                'applicationTiming': 'Apply preventatively or at first signs of disease',
-                'benefits': ['Controls multiple types of blight', 'Improves plant vigor', 'Eco-friendly formulation']
-            }
-        ]
-        
-        # Generate recommendations
-        recommendations = generate_recommendations(farm_data, risk_assessment, products)
+        if metrics.enabled:
+            result['metrics'] = metrics.to_dict()
         
         # Output the recommendations as JSON
-        print(json.dumps({
-            'recommendations': recommendations,
-            'timestamp': datetime.now().isoformat()
-        }))
+        print(codec.dumps(result))
         
     except Exception as e:
         print(json.dumps({"error": str(e)}))
@@ -261,4 +378,3 @@ def main():
 
 if __name__ == "__main__":
     main()
-
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Region Summary Script
+
+This script streams many farms through the risk assessment and keeps
+per-region, per-crop summaries for the regional advisory team: mean and
+max of each risk score, a histogram of overall crop risk and the top-N
+most at-risk farms. Each farm is folded into the running summaries as soon
+as it is read and then dropped, so memory grows with regions x crops x N,
+not with the number of farms.
+
+Usage:
+    python3 region_summary.py farms.ndjson [--top-n 10] [--bins 10]
+    python3 region_summary.py --state summary.json farms.ndjson
+
+Input lines may be farm records (assessed on the fly), risk assessments
+(with 'cropRisks') or farm reports (with 'riskAssessment'). A farm's
+region is its 'region' field, else the grid cell of location.latitude/
+longitude at --cell-size degrees. Its ID is 'farmId' or 'id', else its
+line number. With --state, the summary is loaded from and saved back to a
+JSON file, so new batches of farms extend an earlier run. A saved summary
+keeps the --top-n and --bins it was started with.
+"""
+
+import sys
+import json
+import math
+import heapq
+import argparse
+import functools
+from datetime import datetime
+
+from batch_runner import DEFAULT_CHUNK_SIZE, run_pool
+from risk_assessment import assess_farm
+
+RISK_METRICS = ('disease', 'pest', 'climate', 'thermal')
+
+DEFAULT_TOP_N = 10
+DEFAULT_BINS = 10
+DEFAULT_CELL_SIZE = 1.0
+
+def farm_region(record, cell_size=DEFAULT_CELL_SIZE):
+    """
+    Return the region label for a farm record
+    """
+    if record.get('region'):
+        return str(record['region'])
+    location = record.get('location') or {}
+    latitude, longitude = location.get('latitude'), location.get('longitude')
+    if latitude is None or longitude is None:
+        return 'unknown'
+    # Label the cell by its south-west corner
+    return (f"{math.floor(latitude / cell_size) * cell_size:g},"
+            f"{math.floor(longitude / cell_size) * cell_size:g}")
+
+def crop_scores(record):
+    """
+    Return {crop: {metric: overall score}} for a farm record, assessment or report
+    """
+    if 'cropRisks' in record:
+        assessment = record
+    elif 'riskAssessment' in record:
+        assessment = record['riskAssessment']
+    else:
+        assessment = assess_farm(record)
+
+    return {
+        crop_type: {metric: risk[metric]['overall'] for metric in RISK_METRICS if metric in risk}
+        for crop_type, risk in assessment['cropRisks'].items()
+    }
+
+def summarize_line(line_number, line, cell_size=DEFAULT_CELL_SIZE):
+    """
+    Reduce one NDJSON line to (region, farm ID, crop scores), or
+    (None, line number, error) if it is bad
+    """
+    if not line.strip():
+        return None
+    try:
+        record = json.loads(line)
+        farm_id = record.get('farmId', record.get('id', line_number))
+        return farm_region(record, cell_size), farm_id, crop_scores(record)
+    except Exception as e:
+        return None, line_number, str(e)
+
+class RegionAggregator:
+    """
+    Running per-region, per-crop risk summaries in bounded memory
+
+    Each (region, crop) keeps score sums, maxima and counts per metric, a
+    fixed-width histogram of overall risk (the max of disease, pest and
+    climate, as in overallRisk) and a min-heap holding the top_n farms by
+    overall risk.
+    """
+    def __init__(self, top_n=DEFAULT_TOP_N, bins=DEFAULT_BINS):
+        self.top_n = top_n
+        self.bins = bins
+        self.farms = 0
+        self.errors = 0
+        self.regions = {}
+        self._sequence = 0
+
+    def _new_summary(self):
+        return {
+            'farms': 0,
+            'sums': dict.fromkeys(RISK_METRICS, 0.0),
+            'counts': dict.fromkeys(RISK_METRICS, 0),
+            'max': dict.fromkeys(RISK_METRICS, None),
+            'histogram': [0] * self.bins,
+            'top': []
+        }
+
+    def add(self, region, farm_id, scores):
+        """
+        Fold one farm's crop scores into its region's summaries
+        """
+        self.farms += 1
+        crops = self.regions.setdefault(region, {})
+        for crop_type, metrics in scores.items():
+            summary = crops.get(crop_type)
+            if summary is None:
+                summary = crops[crop_type] = self._new_summary()
+
+            summary['farms'] += 1
+            for metric, score in metrics.items():
+                summary['sums'][metric] += score
+                summary['counts'][metric] += 1
+                if summary['max'][metric] is None or score > summary['max'][metric]:
+                    summary['max'][metric] = score
+
+            overall = max((metrics[metric] for metric in ('disease', 'pest', 'climate') if metric in metrics),
+                          default=0)
+            summary['histogram'][min(int(overall * self.bins / 100), self.bins - 1)] += 1
+
+            # The sequence number breaks ties so farm IDs are never compared
+            self._sequence += 1
+            entry = (overall, -self._sequence, farm_id)
+            if len(summary['top']) < self.top_n:
+                heapq.heappush(summary['top'], entry)
+            elif entry > summary['top'][0]:
+                heapq.heapreplace(summary['top'], entry)
+
+    def _crop_report(self, summary):
+        return {
+            'farms': summary['farms'],
+            'mean': {
+                metric: summary['sums'][metric] / summary['counts'][metric]
+                for metric in RISK_METRICS if summary['counts'][metric]
+            },
+            'max': {metric: value for metric, value in summary['max'].items() if value is not None},
+            'histogram': summary['histogram'],
+            'topFarms': [
+                {'farmId': farm_id, 'risk': overall}
+                for overall, _, farm_id in sorted(summary['top'], reverse=True)
+            ]
+        }
+
+    def summary(self):
+        """
+        Return the current summaries as a JSON-serializable report
+        """
+        return {
+            'regions': {
+                region: {crop_type: self._crop_report(summary) for crop_type, summary in crops.items()}
+                for region, crops in self.regions.items()
+            },
+            'farms': self.farms,
+            'errors': self.errors,
+            'binWidth': 100 / self.bins,
+            'timestamp': datetime.now().isoformat()
+        }
+
+    def to_dict(self):
+        """
+        Serialize the running state so later batches can extend it
+        """
+        return {
+            'topN': self.top_n,
+            'bins': self.bins,
+            'farms': self.farms,
+            'errors': self.errors,
+            'sequence': self._sequence,
+            'regions': self.regions
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Restore a state saved with to_dict
+        """
+        aggregator = cls(data['topN'], data['bins'])
+        aggregator.farms = data['farms']
+        aggregator.errors = data['errors']
+        aggregator._sequence = data['sequence']
+        aggregator.regions = data['regions']
+        for crops in aggregator.regions.values():
+            for summary in crops.values():
+                # JSON turns the heap's tuples into lists; the heap order is unchanged
+                summary['top'] = [tuple(entry) for entry in summary['top']]
+        return aggregator
+
+def main():
+    """
+    Main function to stream farms into per-region risk summaries
+    """
+    parser = argparse.ArgumentParser(description='Summarize crop risks by region over many farms')
+    parser.add_argument('input_file', nargs='?', help='NDJSON farm records or assessments ("-" for stdin)')
+    parser.add_argument('--workers', type=int, default=0, help='Assess records across N worker processes')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='Records sent to a worker at a time')
+    parser.add_argument('--top-n', type=int,
+                        help=f'Most at-risk farms kept per region and crop (default {DEFAULT_TOP_N})')
+    parser.add_argument('--bins', type=int, help=f'Histogram bins over the 0-100 risk range (default {DEFAULT_BINS})')
+    parser.add_argument('--cell-size', type=float, default=DEFAULT_CELL_SIZE,
+                        help='Grid cell size in degrees for farms without a region')
+    parser.add_argument('--state', help='Load the running summary from and save it back to this JSON file')
+    args = parser.parse_args()
+
+    try:
+        aggregator = None
+        if args.state:
+            try:
+                with open(args.state, 'r') as f:
+                    aggregator = RegionAggregator.from_dict(json.load(f))
+            except FileNotFoundError:
+                pass
+        if aggregator is None:
+            aggregator = RegionAggregator(args.top_n or DEFAULT_TOP_N, args.bins or DEFAULT_BINS)
+        else:
+            # A saved summary keeps its own layout; refuse flags that disagree with it
+            for flag, value, saved in (('--top-n', args.top_n, aggregator.top_n), ('--bins', args.bins, aggregator.bins)):
+                if value is not None and value != saved:
+                    parser.error(f"{flag} {value} does not match the {saved} saved in {args.state}")
+
+        input_file = args.input_file or '-'
+        stream = sys.stdin if input_file == '-' else open(input_file, 'r')
+        try:
+            if args.workers:
+                process_line = functools.partial(summarize_line, cell_size=args.cell_size)
+                reduced = run_pool(process_line, stream, args.workers, args.chunk_size)
+            else:
+                reduced = (summarize_line(line_number, line, args.cell_size)
+                           for line_number, line in enumerate(stream, 1))
+
+            for item in reduced:
+                if item is None:
+                    continue
+                region, farm_id, scores = item
+                if region is None:
+                    aggregator.errors += 1
+                    print(json.dumps({"error": scores, "line": farm_id}), file=sys.stderr)
+                    continue
+                aggregator.add(region, farm_id, scores)
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        if args.state:
+            with open(args.state, 'w') as f:
+                json.dump(aggregator.to_dict(), f)
+
+        print(json.dumps(aggregator.summary()))
+    except Exception as e:
+        print(json.dumps({"error": str(e)}))
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Result Cache
+
+Content-addressed cache for scoring results. Keys are SHA-256 hashes of the
+canonical JSON encoding of the inputs, so the same farm sent twice maps to
+the same entry no matter how its keys were ordered. Entries live in an
+in-process LRU with an optional on-disk tier shared between processes, and
+expire at the next weather forecast refresh.
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+import collections
+
+# Forecasts refresh hourly, so cached results expire on the hour
+FORECAST_REFRESH_SECONDS = 3600
+
+DEFAULT_MAX_ENTRIES = 1024
+
+def cache_key(*parts):
+    """
+    Hash JSON-serializable inputs into a stable content address
+    """
+    canonical = json.dumps(parts, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+class ResultCache:
+    """
+    Thread-safe LRU cache with TTL eviction and an optional disk tier
+
+    With align_to_refresh, every entry expires at the next multiple of ttl
+    seconds (the forecast refresh boundary) rather than ttl after insertion,
+    so no result outlives the forecast it was computed from.
+    """
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl=FORECAST_REFRESH_SECONDS,
+                 disk_dir=None, align_to_refresh=True):
+        if ttl <= 0:
+            raise ValueError(f"Cache TTL must be positive, got {ttl}")
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.disk_dir = disk_dir
+        self.align_to_refresh = align_to_refresh
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def _expiry(self, now):
+        if self.align_to_refresh:
+            return (now // self.ttl + 1) * self.ttl
+        return now + self.ttl
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, key[:2], f"{key}.json")
+
+    def _read_disk(self, key, now):
+        try:
+            with open(self._disk_path(key), 'r') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry['expires'] <= now:
+            return None
+        return entry
+
+    def _write_disk(self, key, expires, value):
+        path = self._disk_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump({'expires': expires, 'value': value}, f)
+        os.replace(temp_path, path)
+
+    def _store(self, key, expires, value):
+        self._entries[key] = (expires, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, key):
+        """
+        Return the cached value for key, or None on a miss
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, value = entry
+                if expires > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+                self.evictions += 1
+
+            if self.disk_dir:
+                entry = self._read_disk(key, now)
+                if entry is not None:
+                    self._store(key, entry['expires'], entry['value'])
+                    self.disk_hits += 1
+                    return entry['value']
+
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        """
+        Cache value under key until the next expiry
+        """
+        expires = self._expiry(time.time())
+        with self._lock:
+            self._store(key, expires, value)
+        if self.disk_dir:
+            self._write_disk(key, expires, value)
+
+    def stats(self):
+        """
+        Return the hit/miss counters
+        """
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'diskHits': self.disk_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries)
+            }
+
+_open_caches = {}
+
+def open_cache(max_entries=DEFAULT_MAX_ENTRIES, ttl=FORECAST_REFRESH_SECONDS, disk_dir=None):
+    """
+    Return this process's shared ResultCache for a configuration
+    """
+    key = (max_entries, ttl, disk_dir, os.getpid())
+    cache = _open_caches.get(key)
+    if cache is None:
+        cache = _open_caches[key] = ResultCache(max_entries, ttl, disk_dir)
+    return cache
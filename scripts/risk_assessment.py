@@ -9,50 +9,147 @@ to assess risks for crops based on environmental conditions.
 import sys
 import json
 import math
+import argparse
+import functools
+from bisect import bisect_left, bisect_right
 from datetime import datetime, timedelta
 
-def calculate_disease_risk(weather_data, crop_type):
+from batch_runner import DEFAULT_CHUNK_SIZE, run_ndjson
+from crop_params import REGISTRY, crop_id
+from weather_series import WeatherSeries, attach_series
+from result_cache import DEFAULT_MAX_ENTRIES, FORECAST_REFRESH_SECONDS, cache_key, open_cache
+from metrics import NULL_METRICS, Metrics
+from wire_formats import JSON_CODEC, TEXT_CODEC_NAMES, get_codec
+
+def summarize_weather(weather_data):
     """
-    Calculate disease risk based on weather conditions and crop type
+    Scan the weather window once and count the days that fall in each
+    threshold band used by the disease, pest and climate calculators
+
+    weather_data is a list of daily dicts or a WeatherSeries.
     """
-    # Initialize risk factors
-    humidity_risk = 0
-    temperature_risk = 0
-    rainfall_risk = 0
-    
-    # Process weather data
-    for day in weather_data:
-        # High humidity increases disease risk
-        if day['humidity'] > 80:
-            humidity_risk += 10
-        elif day['humidity'] > 70:
-            humidity_risk += 5
-            
-        # Temperature ranges for disease development
-        if 18 <= day['temperature'] <= 28:
-            temperature_risk += 8
-        elif 15 <= day['temperature'] <= 30:
-            temperature_risk += 4
-            
-        # Rainfall increases disease risk
-        if day['rainfall'] > 10:
-            rainfall_risk += 12
-        elif day['rainfall'] > 5:
-            rainfall_risk += 6
+    humidity_over_80 = humidity_70_to_80 = 0
+    humidity_60_to_80 = humidity_50_to_90 = 0
+    temperature_18_to_28 = temperature_15_to_30 = 0
+    temperature_over_35 = temperature_32_to_35 = temperature_30_to_32 = 0
+    temperature_25_to_30 = temperature_20_to_25 = 0
+    rainfall_over_50 = rainfall_30_to_50 = rainfall_20_to_30 = 0
+    rainfall_10_to_20 = rainfall_5_to_10 = 0
+    dry_hot_days = dry_days = 0
+    
+    # Histograms of daily extremes against every crop's heat and frost limits
+    heat_thresholds = REGISTRY['heatThresholds']
+    frost_thresholds = REGISTRY['frostThresholds']
+    heat_buckets = [0] * (len(heat_thresholds) + 1)
+    frost_buckets = [0] * (len(frost_thresholds) + 1)
+    
+    # Daily extremes that are absent or null fall back to the daily temperature
+    if isinstance(weather_data, WeatherSeries):
+        rows = weather_data.rows()
+    else:
+        rows = ((day['temperature'], day['humidity'], day['rainfall'],
+                 v if (v := day.get('temperatureMax')) is not None else day['temperature'],
+                 v if (v := day.get('temperatureMin')) is not None else day['temperature'])
+                for day in weather_data)
+    
+    for temperature, humidity, rainfall, temperature_max, temperature_min in rows:
+        heat_buckets[bisect_left(heat_thresholds, temperature_max)] += 1
+        frost_buckets[bisect_right(frost_thresholds, temperature_min)] += 1
+        
+        # Humidity bands (disease, then pest)
+        if humidity > 80:
+            humidity_over_80 += 1
+        elif humidity > 70:
+            humidity_70_to_80 += 1
+        if 60 <= humidity <= 80:
+            humidity_60_to_80 += 1
+        elif 50 <= humidity <= 90:
+            humidity_50_to_90 += 1
+        
+        # Temperature bands (disease window, then pest and heat tiers)
+        if 18 <= temperature <= 28:
+            temperature_18_to_28 += 1
+        elif 15 <= temperature <= 30:
+            temperature_15_to_30 += 1
+        if temperature > 35:
+            temperature_over_35 += 1
+        elif temperature > 32:
+            temperature_32_to_35 += 1
+        elif temperature > 30:
+            temperature_30_to_32 += 1
+        elif temperature > 25:
+            temperature_25_to_30 += 1
+        elif temperature > 20:
+            temperature_20_to_25 += 1
+        
+        # Rainfall bands (disease and flood tiers)
+        if rainfall > 50:
+            rainfall_over_50 += 1
+        elif rainfall > 30:
+            rainfall_30_to_50 += 1
+        elif rainfall > 20:
+            rainfall_20_to_30 += 1
+        elif rainfall > 10:
+            rainfall_10_to_20 += 1
+        elif rainfall > 5:
+            rainfall_5_to_10 += 1
+        
+        # Drought days
+        if rainfall < 1 and temperature > 30:
+            dry_hot_days += 1
+        elif rainfall < 2:
+            dry_days += 1
+    
+    return {
+        'days': len(weather_data),
+        'humidityOver80': humidity_over_80,
+        'humidity70To80': humidity_70_to_80,
+        'humidity60To80': humidity_60_to_80,
+        'humidity50To90': humidity_50_to_90,
+        'temperature18To28': temperature_18_to_28,
+        'temperature15To30': temperature_15_to_30,
+        'temperatureOver35': temperature_over_35,
+        'temperature32To35': temperature_32_to_35,
+        'temperature30To32': temperature_30_to_32,
+        'temperature25To30': temperature_25_to_30,
+        'temperature20To25': temperature_20_to_25,
+        'rainfallOver50': rainfall_over_50,
+        'rainfall30To50': rainfall_30_to_50,
+        'rainfall20To30': rainfall_20_to_30,
+        'rainfall10To20': rainfall_10_to_20,
+        'rainfall5To10': rainfall_5_to_10,
+        'dryHotDays': dry_hot_days,
+        'dryDays': dry_days,
+        'heatBuckets': heat_buckets,
+        'frostBuckets': frost_buckets
+    }
+
+def disease_risk_from_summary(summary, crop_type):
+    """
+    Calculate disease risk from the band counts produced by summarize_weather
+    """
+    # High humidity increases disease risk
+    humidity_risk = summary['humidityOver80'] * 10 + summary['humidity70To80'] * 5
+    
+    # Temperature ranges for disease development
+    temperature_risk = summary['temperature18To28'] * 8 + summary['temperature15To30'] * 4
+    
+    # Rainfall increases disease risk
+    rainfall_over_10 = (summary['rainfallOver50'] + summary['rainfall30To50'] +
+                        summary['rainfall20To30'] + summary['rainfall10To20'])
+    rainfall_risk = rainfall_over_10 * 12 + summary['rainfall5To10'] * 6
     
     # Normalize risks
-    days = len(weather_data)
+    days = summary['days']
     humidity_risk = min(100, humidity_risk / days * 10)
     temperature_risk = min(100, temperature_risk / days * 10)
     rainfall_risk = min(100, rainfall_risk / days * 10)
     
-    # Crop-specific adjustments
-    if crop_type.lower() == 'cotton':
-        # Cotton is more susceptible to certain diseases in humid conditions
-        humidity_risk *= 1.2
-    elif crop_type.lower() == 'chickpea':
-        # Chickpea is more susceptible to diseases in wet conditions
-        rainfall_risk *= 1.3
+    # Crop-specific adjustments (see CROP_ADJUSTMENTS in crop_params.py)
+    crop = crop_id(crop_type)
+    humidity_risk *= REGISTRY['diseaseHumidity'][crop]
+    temperature_risk *= REGISTRY['diseaseTemperature'][crop]
+    rainfall_risk *= REGISTRY['diseaseRainfall'][crop]
     
     # Calculate overall disease risk
     overall_risk = (humidity_risk * 0.4) + (temperature_risk * 0.3) + (rainfall_risk * 0.3)
@@ -66,42 +163,28 @@ def calculate_disease_risk(weather_data, crop_type):
         }
     }
 
-def calculate_pest_risk(weather_data, crop_type):
+def pest_risk_from_summary(summary, crop_type):
     """
-    Calculate pest risk based on weather conditions and crop type
+    Calculate pest risk from the band counts produced by summarize_weather
     """
-    # Initialize risk factors
-    temperature_risk = 0
-    humidity_risk = 0
-    
-    # Process weather data
-    for day in weather_data:
-        # Many pests thrive in warm conditions
-        if day['temperature'] > 30:
-            temperature_risk += 12
-        elif day['temperature'] > 25:
-            temperature_risk += 8
-        elif day['temperature'] > 20:
-            temperature_risk += 4
-            
-        # Moderate humidity favors many pests
-        if 60 <= day['humidity'] <= 80:
-            humidity_risk += 10
-        elif 50 <= day['humidity'] <= 90:
-            humidity_risk += 5
+    # Many pests thrive in warm conditions
+    temperature_over_30 = (summary['temperatureOver35'] + summary['temperature32To35'] +
+                           summary['temperature30To32'])
+    temperature_risk = (temperature_over_30 * 12 + summary['temperature25To30'] * 8 +
+                        summary['temperature20To25'] * 4)
+    
+    # Moderate humidity favors many pests
+    humidity_risk = summary['humidity60To80'] * 10 + summary['humidity50To90'] * 5
     
     # Normalize risks
-    days = len(weather_data)
+    days = summary['days']
     temperature_risk = min(100, temperature_risk / days * 10)
     humidity_risk = min(100, humidity_risk / days * 10)
     
-    # Crop-specific adjustments
-    if crop_type.lower() == 'cotton':
-        # Cotton is particularly susceptible to aphids and bollworms
-        temperature_risk *= 1.3
-    elif crop_type.lower() == 'chickpea':
-        # Chickpea has specific pest pressures
-        humidity_risk *= 1.1
+    # Crop-specific adjustments (see CROP_ADJUSTMENTS in crop_params.py)
+    crop = crop_id(crop_type)
+    temperature_risk *= REGISTRY['pestTemperature'][crop]
+    humidity_risk *= REGISTRY['pestHumidity'][crop]
     
     # Calculate overall pest risk
     overall_risk = (temperature_risk * 0.6) + (humidity_risk * 0.4)
@@ -114,53 +197,32 @@ def calculate_pest_risk(weather_data, crop_type):
         }
     }
 
-def calculate_climate_stress(weather_data, crop_type):
+def climate_stress_from_summary(summary, crop_type):
     """
-    Calculate climate stress based on weather conditions and crop type
+    Calculate climate stress from the band counts produced by summarize_weather
     """
-    # Initialize risk factors
-    heat_stress = 0
-    drought_stress = 0
-    flood_stress = 0
-    
-    # Process weather data
-    for day in weather_data:
-        # Heat stress
-        if day['temperature'] > 35:
-            heat_stress += 15
-        elif day['temperature'] > 32:
-            heat_stress += 8
-        elif day['temperature'] > 30:
-            heat_stress += 4
-            
-        # Drought stress (low rainfall over time)
-        if day['rainfall'] < 1 and day['temperature'] > 30:
-            drought_stress += 10
-        elif day['rainfall'] < 2:
-            drought_stress += 5
-            
-        # Flood stress (high rainfall)
-        if day['rainfall'] > 50:
-            flood_stress += 20
-        elif day['rainfall'] > 30:
-            flood_stress += 12
-        elif day['rainfall'] > 20:
-            flood_stress += 6
+    # Heat stress
+    heat_stress = (summary['temperatureOver35'] * 15 + summary['temperature32To35'] * 8 +
+                   summary['temperature30To32'] * 4)
+    
+    # Drought stress (low rainfall over time)
+    drought_stress = summary['dryHotDays'] * 10 + summary['dryDays'] * 5
+    
+    # Flood stress (high rainfall)
+    flood_stress = (summary['rainfallOver50'] * 20 + summary['rainfall30To50'] * 12 +
+                    summary['rainfall20To30'] * 6)
     
     # Normalize risks
-    days = len(weather_data)
+    days = summary['days']
     heat_stress = min(100, heat_stress / days * 10)
     drought_stress = min(100, drought_stress / days * 10)
     flood_stress = min(100, flood_stress / days * 10)
     
-    # Crop-specific adjustments
-    if crop_type.lower() == 'cotton':
-        # Cotton is relatively drought-tolerant but sensitive to waterlogging
-        drought_stress *= 0.8
-        flood_stress *= 1.2
-    elif crop_type.lower() == 'chickpea':
-        # Chickpea is sensitive to heat during flowering
-        heat_stress *= 1.3
+    # Crop-specific adjustments (see CROP_ADJUSTMENTS in crop_params.py)
+    crop = crop_id(crop_type)
+    heat_stress *= REGISTRY['climateHeat'][crop]
+    drought_stress *= REGISTRY['climateDrought'][crop]
+    flood_stress *= REGISTRY['climateFlood'][crop]
     
     # Calculate overall climate stress
     overall_stress = max(heat_stress, drought_stress, flood_stress)
@@ -174,6 +236,73 @@ def calculate_climate_stress(weather_data, crop_type):
         }
     }
 
+def thermal_stress_from_summary(summary, crop_type):
+    """
+    Calculate heat and frost stress against the crop's limits in stress_buster.csv
+
+    Days above TMaxOptimum / TMaxLimit and below TMinFrost are read off the
+    histograms built by summarize_weather. Crops without limits score zero.
+    """
+    crop = crop_id(crop_type)
+    heat_buckets = summary['heatBuckets']
+    frost_buckets = summary['frostBuckets']
+    
+    # A day is above heat threshold j when its bucket is past j
+    optimum_index = REGISTRY['heatOptimumIndex'][crop]
+    limit_index = REGISTRY['heatLimitIndex'][crop]
+    above_optimum = sum(heat_buckets[optimum_index + 1:]) if optimum_index >= 0 else 0
+    above_limit = sum(heat_buckets[limit_index + 1:]) if limit_index >= 0 else 0
+    
+    # A day is below frost threshold j when its bucket is at or before j
+    frost_index = REGISTRY['frostIndex'][crop]
+    frost_days = sum(frost_buckets[:frost_index + 1]) if frost_index >= 0 else 0
+    
+    # Days past the hard limit weigh more than days past the optimum
+    heat_stress = above_limit * 15 + (above_optimum - above_limit) * 8
+    frost_stress = frost_days * 15
+    
+    # Normalize risks
+    days = summary['days']
+    heat_stress = min(100, heat_stress / days * 10)
+    frost_stress = min(100, frost_stress / days * 10)
+    
+    return {
+        'overall': max(heat_stress, frost_stress),
+        'factors': {
+            'heat': heat_stress,
+            'frost': frost_stress
+        }
+    }
+
+def calculate_disease_risk(weather_data, crop_type):
+    """
+    Calculate disease risk based on weather conditions and crop type
+    """
+    return disease_risk_from_summary(summarize_weather(weather_data), crop_type)
+
+def calculate_pest_risk(weather_data, crop_type):
+    """
+    Calculate pest risk based on weather conditions and crop type
+    """
+    return pest_risk_from_summary(summarize_weather(weather_data), crop_type)
+
+def calculate_climate_stress(weather_data, crop_type):
+    """
+    Calculate climate stress based on weather conditions and crop type
+    """
+    return climate_stress_from_summary(summarize_weather(weather_data), crop_type)
+
+def crop_risk_from_summary(weather_summary, crop_type):
+    """
+    Score every risk for one crop from a summarize_weather() result
+    """
+    return {
+        'disease': disease_risk_from_summary(weather_summary, crop_type),
+        'pest': pest_risk_from_summary(weather_summary, crop_type),
+        'climate': climate_stress_from_summary(weather_summary, crop_type),
+        'thermal': thermal_stress_from_summary(weather_summary, crop_type)
+    }
+
 def assess_soil_health(soil_data):
     """
     Assess soil health based on soil data
@@ -275,52 +404,179 @@ def assess_soil_health(soil_data):
         }
     }
 
+def compile_assessment(crop_risks, soil_health):
+    """
+    Compile per-crop risks and soil health into the risk assessment response
+    """
+    return {
+        'cropRisks': crop_risks,
+        'soilHealth': soil_health,
+        'timestamp': datetime.now().isoformat(),
+        'overallRisk': {
+            'disease': max([risk['disease']['overall'] for crop, risk in crop_risks.items()]),
+            'pest': max([risk['pest']['overall'] for crop, risk in crop_risks.items()]),
+            'climate': max([risk['climate']['overall'] for crop, risk in crop_risks.items()])
+        }
+    }
+
+def assess_farm(farm_data, cache=None, metrics=NULL_METRICS):
+    """
+    Generate the full risk assessment for one farm record
+
+    With a ResultCache, farms whose weather, soil and crops were already
+    assessed return the cached assessment instead of being rescored. Pass a
+    Metrics to record per-stage wall time and counters.
+    """
+    # Extract necessary data
+    weather_data = farm_data.get('weatherData', [])
+    soil_data = farm_data.get('soilData', {})
+    crops = farm_data.get('crops', [])
+    metrics.count('records')
+    
+    if cache is not None:
+        with metrics.stage('cache_lookup'):
+            weather_key = weather_data.to_dict() if isinstance(weather_data, WeatherSeries) else weather_data
+            key = cache_key(weather_key, soil_data, crops)
+            cached = cache.get(key)
+        if cached is not None:
+            metrics.count('cacheHits')
+            return cached
+        metrics.count('cacheMisses')
+    
+    # Scan the weather once and share the band counts across all crops
+    with metrics.stage('summarize_weather'):
+        weather_summary = summarize_weather(weather_data)
+    metrics.count('weatherDays', weather_summary['days'])
+    
+    # Generate risk assessments for each crop
+    crop_risks = {}
+    with metrics.stage('crop_scoring'):
+        for crop in crops:
+            crop_type = crop.get('type', '')
+            crop_risks[crop_type] = crop_risk_from_summary(weather_summary, crop_type)
+    metrics.count('crops', len(crops))
+    
+    # Assess soil health
+    with metrics.stage('soil_health'):
+        soil_health = assess_soil_health(soil_data)
+    
+    risk_assessment = compile_assessment(crop_risks, soil_health)
+    
+    if cache is not None:
+        cache.put(key, risk_assessment)
+    
+    return risk_assessment
+
+def decode_farm(text, codec=JSON_CODEC, weather_series=False):
+    """
+    Decode one farm record with the given codec
+
+    With weather_series, the record's weatherData is converted into a
+    compact WeatherSeries after decoding.
+    """
+    farm_data = codec.loads(text)
+    if weather_series:
+        return attach_series(farm_data)
+    return farm_data
+
+def assess_line(line_number, line, cache_config=None, with_metrics=False, codec=JSON_CODEC, weather_series=False):
+    """
+    Assess one NDJSON farm record and return the JSON output line
+
+    A record that fails to parse or score yields an error line tagged with
+    its line number instead of raising. Blank lines return None. cache_config
+    holds open_cache() arguments for this process's result cache. With
+    with_metrics, the record's timings are added as a 'metrics' block.
+    codec decodes the record and encodes the output line; weather_series
+    is passed on to decode_farm.
+    """
+    if not line.strip():
+        return None
+    metrics = Metrics() if with_metrics else NULL_METRICS
+    try:
+        cache = open_cache(**cache_config) if cache_config else None
+        with metrics.stage('parse'):
+            farm_data = decode_farm(line, codec, weather_series)
+        result = assess_farm(farm_data, cache, metrics)
+    except Exception as e:
+        result = {"error": str(e), "line": line_number}
+    if with_metrics:
+        result = {**result, 'metrics': metrics.to_dict()}
+    return codec.dumps(result)
+
+def assess_stream(lines):
+    """
+    Assess newline-delimited farm records one at a time, yielding one JSON
+    line per record as soon as it is scored
+    """
+    for line_number, line in enumerate(lines, 1):
+        output_line = assess_line(line_number, line)
+        if output_line is not None:
+            yield output_line
+
 def main():
     """
     Main function to process farm data and generate risk assessment
     """
-    if len(sys.argv) < 2:
+    parser = argparse.ArgumentParser(description='Assess crop risks for farm data')
+    parser.add_argument('input_file', nargs='?', help='Farm data JSON file (NDJSON with --ndjson, "-" for stdin)')
+    parser.add_argument('--ndjson', action='store_true', help='Stream newline-delimited farm records, one result per line')
+    parser.add_argument('--workers', type=int, default=0, help='Shard --ndjson records across N worker processes')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='Records sent to a worker at a time')
+    parser.add_argument('--cache-size', type=int, default=0, help='Cache up to N assessments in memory')
+    parser.add_argument('--cache-dir', help='Also cache assessments on disk in this directory')
+    parser.add_argument('--cache-ttl', type=int, default=FORECAST_REFRESH_SECONDS,
+                        help='Forecast refresh interval in seconds; cached results expire at the next refresh')
+    parser.add_argument('--metrics', action='store_true',
+                        help='Add per-stage timings, counters and peak memory as a "metrics" block')
+    parser.add_argument('--codec', choices=TEXT_CODEC_NAMES, default='json',
+                        help='JSON codec for reading and writing records (auto picks orjson when installed)')
+    parser.add_argument('--weather-series', action='store_true',
+                        help='Hold daily weather as compact float columns instead of a list of dicts')
+    args = parser.parse_args()
+    
+    if args.workers and not args.ndjson:
+        parser.error('--workers requires --ndjson')
+    if args.cache_ttl <= 0:
+        parser.error('--cache-ttl must be a positive number of seconds')
+    
+    try:
+        codec = get_codec(args.codec)
+    except ValueError as e:
+        parser.error(str(e))
+    
+    cache_config = None
+    if args.cache_size or args.cache_dir:
+        cache_config = {'max_entries': args.cache_size or DEFAULT_MAX_ENTRIES,
+                        'ttl': args.cache_ttl, 'disk_dir': args.cache_dir}
+    
+    if args.ndjson:
+        process_line = functools.partial(assess_line, cache_config=cache_config, with_metrics=args.metrics,
+                                         codec=codec, weather_series=args.weather_series)
+        run_ndjson(process_line, args.input_file or '-', args.workers, args.chunk_size)
+        return
+    
+    if args.input_file is None:
         print(json.dumps({"error": "No input file provided"}))
         sys.exit(1)
     
-    input_file = sys.argv[1]
+    input_file = args.input_file
+    
+    metrics = Metrics() if args.metrics else NULL_METRICS
     
     try:
-        with open(input_file, 'r') as f:
-            farm_data = json.load(f)
+        with metrics.stage('parse'):
+            with open(input_file, 'r') as f:
+                farm_data = decode_farm(f.read(), codec, args.weather_series)
         
-        # Extract necessary data
-        weather_data = farm_data.get('weatherData', [])
-        soil_data = farm_data.get('soilData', {})
-        crops = farm_data.get('crops', [])
+        cache = open_cache(**cache_config) if cache_config else None
+        risk_assessment = assess_farm(farm_data, cache, metrics)
         
-        # Generate risk assessments for each crop
-        crop_risks = {}
-        for crop in crops:
-            crop_type = crop.get('type', '')
-            crop_risks[crop_type] = {
-                'disease': calculate_disease_risk(weather_data, crop_type),
-                'pest': calculate_pest_risk(weather_data, crop_type),
-                'climate': calculate_climate_stress(weather_data, crop_type)
-            }
-        
-        # Assess soil health
-        soil_health = assess_soil_health(soil_data)
-        
-        # Compile the risk assessment
-        risk_assessment = {
-            'cropRisks': crop_risks,
-            'soilHealth': soil_health,
-            'timestamp': datetime.now().isoformat(),
-            'overallRisk': {
-                'disease': max([risk['disease']['overall'] for crop, risk in crop_risks.items()]),
-                'pest': max([risk['pest']['overall'] for crop, risk in crop_risks.items()]),
-                'climate': max([risk['climate']['overall'] for crop, risk in crop_risks.items()])
-            }
-        }
+        if metrics.enabled:
+            risk_assessment = {**risk_assessment, 'metrics': metrics.to_dict()}
         
         # Output the risk assessment as JSON
-        print(json.dumps(risk_assessment))
+        print(codec.dumps(risk_assessment))
         
     except Exception as e:
         print(json.dumps({"error": str(e)}))
@@ -328,4 +584,3 @@ def main():
 
 if __name__ == "__main__":
     main()
-
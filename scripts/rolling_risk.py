@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Rolling Risk State
+
+This module keeps the weather band counts for one farm's sliding forecast
+window, so that when the window moves by a day only that day is added and
+the oldest day dropped. Scores come from the same *_from_summary functions
+used by risk_assessment.py and match a full recomputation over the window.
+"""
+
+import copy
+import collections
+
+from risk_assessment import (
+    summarize_weather,
+    disease_risk_from_summary,
+    pest_risk_from_summary,
+    climate_stress_from_summary,
+    thermal_stress_from_summary
+)
+
+def day_bands(day):
+    """
+    Return the weather bands a single day falls in, as the band names plus
+    the day's heat and frost histogram buckets
+    """
+    counts = summarize_weather([day])
+    bands = tuple(band for band, count in counts.items() if isinstance(count, int) and count and band != 'days')
+    return bands, counts['heatBuckets'].index(1), counts['frostBuckets'].index(1)
+
+class RollingRiskState:
+    """
+    Running band counts over a sliding window of daily weather
+
+    add_day/drop_day update the counts in constant time. push() adds a day
+    and, once window_days is reached, drops the oldest one.
+    """
+    def __init__(self, crop_types, window_days=None, weather_data=()):
+        self.crop_types = list(crop_types)
+        self.window_days = window_days
+        self.window = collections.deque()
+        self.counts = summarize_weather([])
+        for day in weather_data:
+            self.push(day)
+
+    def add_day(self, day):
+        """
+        Add the newest day to the window
+        """
+        bands, heat_bucket, frost_bucket = entry = day_bands(day)
+        self.window.append(entry)
+        self.counts['days'] += 1
+        self.counts['heatBuckets'][heat_bucket] += 1
+        self.counts['frostBuckets'][frost_bucket] += 1
+        for band in bands:
+            self.counts[band] += 1
+
+    def drop_day(self):
+        """
+        Drop the oldest day from the window
+        """
+        bands, heat_bucket, frost_bucket = self.window.popleft()
+        self.counts['days'] -= 1
+        self.counts['heatBuckets'][heat_bucket] -= 1
+        self.counts['frostBuckets'][frost_bucket] -= 1
+        for band in bands:
+            self.counts[band] -= 1
+
+    def push(self, day):
+        """
+        Slide the window forward by one day
+        """
+        self.add_day(day)
+        if self.window_days is not None and len(self.window) > self.window_days:
+            self.drop_day()
+
+    def crop_risks(self):
+        """
+        Return the disease, pest, climate and thermal scores for every crop, in the
+        same layout as cropRisks in a full risk assessment
+        """
+        return {
+            crop_type: {
+                'disease': disease_risk_from_summary(self.counts, crop_type),
+                'pest': pest_risk_from_summary(self.counts, crop_type),
+                'climate': climate_stress_from_summary(self.counts, crop_type),
+                'thermal': thermal_stress_from_summary(self.counts, crop_type)
+            }
+            for crop_type in self.crop_types
+        }
+
+    def to_dict(self):
+        """
+        Serialize the state so it can be stored between runs
+        """
+        return {
+            'cropTypes': self.crop_types,
+            'windowDays': self.window_days,
+            'window': [[list(bands), heat_bucket, frost_bucket] for bands, heat_bucket, frost_bucket in self.window],
+            'counts': copy.deepcopy(self.counts)
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Restore a state saved with to_dict
+        """
+        state = cls(data['cropTypes'], data['windowDays'])
+        state.window = collections.deque(
+            (tuple(bands), heat_bucket, frost_bucket) for bands, heat_bucket, frost_bucket in data['window']
+        )
+        state.counts = copy.deepcopy(data['counts'])
+        return state
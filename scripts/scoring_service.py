@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+Scoring Service
+
+Asyncio HTTP service for the risk assessment and recommendation functions,
+for use in place of spawning the scripts from the API routes. Concurrent
+requests are queued and collected into micro-batches: the first request
+opens a batch, which closes when it holds --max-batch requests or
+--batch-window-ms has passed. Risk assessments in a batch are scored
+together through batch_scoring.assess_farms when NumPy is installed, and
+each caller gets its own response.
+
+Backpressure: at most --queue-depth requests wait for a batch; beyond that
+the service answers 503 at once instead of letting latency grow.
+
+Usage:
+    python3 scoring_service.py [--port 8765] [--max-batch 64]
+        [--batch-window-ms 5] [--queue-depth 1024]
+
+Endpoints:
+    POST /risk-assessment    farm data -> risk assessment
+    POST /recommendations    {farmData, riskAssessment} -> recommendations
+    POST /farm-report        farm data -> {riskAssessment, recommendations}
+    GET  /health
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import concurrent.futures
+from datetime import datetime
+
+from risk_assessment import assess_farm
+from recommendations import DEFAULT_TOP_K, generate_recommendations, recommend_products, resolve_products
+from product_catalog import open_catalog
+
+try:
+    from batch_scoring import assess_farms
+except ImportError:
+    # Without NumPy a batch is scored one farm at a time
+    assess_farms = None
+
+DEFAULT_PORT = 8765
+DEFAULT_MAX_BATCH = 64
+DEFAULT_BATCH_WINDOW_MS = 5
+DEFAULT_QUEUE_DEPTH = 1024
+MAX_BODY_BYTES = 8 * 1024 * 1024
+
+HTTP_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+                413: 'Payload Too Large', 500: 'Internal Server Error', 503: 'Service Unavailable'}
+
+class QueueFull(Exception):
+    pass
+
+def assess_batch(farms):
+    """
+    Assess a batch of farms, returning one assessment or exception per farm
+    """
+    if assess_farms is not None:
+        try:
+            return assess_farms(farms)
+        except Exception:
+            # A bad record fails the vectorized pass; rescore one by one to isolate it
+            pass
+
+    results = []
+    for farm in farms:
+        try:
+            results.append(assess_farm(farm))
+        except Exception as e:
+            results.append(e)
+    return results
+
+def score_batch(method, params_list, products, top_k):
+    """
+    Score one micro-batch of requests for the same method
+    """
+    if method == 'recommendations':
+        results = []
+        for params in params_list:
+            try:
+                results.append(recommend_products(params, products, top_k))
+            except Exception as e:
+                results.append(e)
+        return results
+
+    assessments = assess_batch(params_list)
+    if method == 'risk-assessment':
+        return assessments
+
+    # farm-report: recommend from the in-memory assessments
+    products, index = resolve_products(products)
+    results = []
+    for farm_data, risk_assessment in zip(params_list, assessments):
+        if isinstance(risk_assessment, Exception):
+            results.append(risk_assessment)
+            continue
+        try:
+            results.append({
+                'riskAssessment': risk_assessment,
+                'recommendations': generate_recommendations(farm_data, risk_assessment, products, index, top_k),
+                'timestamp': datetime.now().isoformat()
+            })
+        except Exception as e:
+            results.append(e)
+    return results
+
+class MicroBatcher:
+    """
+    Collects requests per method into micro-batches and scores them off the event loop
+
+    Batches run one at a time on a single scoring thread, so the event
+    loop keeps accepting and queueing requests while a batch is scored.
+    """
+    def __init__(self, method, products=None, top_k=DEFAULT_TOP_K, max_batch=DEFAULT_MAX_BATCH,
+                 batch_window=DEFAULT_BATCH_WINDOW_MS / 1000, queue_depth=DEFAULT_QUEUE_DEPTH, executor=None):
+        self.method = method
+        self.products = products
+        self.top_k = top_k
+        self.max_batch = max_batch
+        self.batch_window = batch_window
+        self.queue = asyncio.Queue(maxsize=queue_depth)
+        self.executor = executor
+        self.batches = 0
+        self.requests = 0
+        self.rejected = 0
+
+    async def submit(self, params):
+        """
+        Queue one request and wait for its result
+
+        Raises QueueFull when queue_depth requests are already waiting.
+        """
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self.queue.put_nowait((params, future))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise QueueFull(f"{self.method} queue is full")
+        return await future
+
+    async def run(self):
+        """
+        Form and score batches until cancelled
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.batch_window
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            params_list = [params for params, future in batch]
+            try:
+                results = await loop.run_in_executor(self.executor, score_batch, self.method, params_list,
+                                                     self.products, self.top_k)
+            except Exception as e:
+                results = [e] * len(batch)
+
+            self.batches += 1
+            self.requests += len(batch)
+            for (params, future), result in zip(batch, results):
+                if future.done():
+                    # The client went away while the batch was scored
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+    def stats(self):
+        """
+        Return batch, request and rejection counts and the current queue length
+        """
+        return {'batches': self.batches, 'requests': self.requests, 'rejected': self.rejected,
+                'queued': self.queue.qsize()}
+
+class ScoringService:
+    """
+    Minimal HTTP/1.1 server with keep-alive that routes POSTs to the batchers
+    """
+    def __init__(self, batchers, max_body=MAX_BODY_BYTES):
+        self.batchers = batchers
+        self.max_body = max_body
+        self.started = time.time()
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, path, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    await self.respond(writer, 400, {'error': 'Malformed request line'}, keep_alive=False)
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                keep_alive = (headers.get('connection', '').lower() != 'close'
+                              and version.upper() == 'HTTP/1.1')
+                try:
+                    length = int(headers.get('content-length', 0) or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    await self.respond(writer, 400, {'error': 'Invalid Content-Length'}, keep_alive=False)
+                    break
+                if length > self.max_body:
+                    await self.respond(writer, 413, {'error': 'Request body too large'}, keep_alive=False)
+                    break
+                body = await reader.readexactly(length) if length else b''
+
+                status, payload = await self.dispatch(method, path, body)
+                await self.respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def dispatch(self, method, path, body):
+        """
+        Route one request and return (status, JSON payload)
+        """
+        if path == '/health':
+            return 200, {
+                'status': 'ok',
+                'uptime': time.time() - self.started,
+                'batchers': {name: batcher.stats() for name, batcher in self.batchers.items()}
+            }
+
+        batcher = self.batchers.get(path.strip('/'))
+        if batcher is None:
+            return 404, {'error': f"Unknown path: {path}"}
+        if method != 'POST':
+            return 405, {'error': 'Use POST'}
+
+        try:
+            params = json.loads(body)
+        except ValueError as e:
+            return 400, {'error': f"Invalid JSON: {e}"}
+
+        try:
+            return 200, await batcher.submit(params)
+        except QueueFull as e:
+            return 503, {'error': str(e)}
+        except Exception as e:
+            return 500, {'error': str(e)}
+
+    async def respond(self, writer, status, payload, keep_alive):
+        body = json.dumps(payload).encode('utf-8')
+        head = (f"HTTP/1.1 {status} {HTTP_REASONS.get(status, '')}\r\n"
+                f"Content-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n")
+        if status == 503:
+            head += "Retry-After: 1\r\n"
+        writer.write(head.encode('latin-1') + b'\r\n' + body)
+        await writer.drain()
+
+async def serve(host, port, products, top_k, max_batch, batch_window, queue_depth, max_body):
+    """
+    Start the batchers and the HTTP server and serve until cancelled
+    """
+    # One scoring thread: batches are CPU-bound, so more threads would only contend for the GIL
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+    batchers = {
+        method: MicroBatcher(method, products, top_k, max_batch, batch_window, queue_depth, executor)
+        for method in ('risk-assessment', 'recommendations', 'farm-report')
+    }
+    tasks = [asyncio.create_task(batcher.run()) for batcher in batchers.values()]
+
+    service = ScoringService(batchers, max_body)
+    server = await asyncio.start_server(service.handle_connection, host, port)
+    print(f"Scoring service listening on http://{host}:{port}", file=sys.stderr)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        for task in tasks:
+            task.cancel()
+        executor.shutdown(wait=False)
+
+def main():
+    """
+    Main function to run the scoring service
+    """
+    parser = argparse.ArgumentParser(description='Asyncio HTTP scoring service with request micro-batching')
+    parser.add_argument('--host', default='127.0.0.1', help='Address to listen on')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='Port to listen on')
+    parser.add_argument('--max-batch', type=int, default=DEFAULT_MAX_BATCH, help='Most requests scored in one batch')
+    parser.add_argument('--batch-window-ms', type=float, default=DEFAULT_BATCH_WINDOW_MS,
+                        help='How long a batch stays open for more requests')
+    parser.add_argument('--queue-depth', type=int, default=DEFAULT_QUEUE_DEPTH,
+                        help='Requests waiting per method before new ones are rejected with 503')
+    parser.add_argument('--max-body', type=int, default=MAX_BODY_BYTES, help='Largest accepted request body in bytes')
+    parser.add_argument('--top-k', type=int, default=DEFAULT_TOP_K, help='Recommendations kept per crop')
+    parser.add_argument('--catalog', default=os.environ.get('PRODUCT_CATALOG'),
+                        help='Compiled product catalog (defaults to $PRODUCT_CATALOG, else the built-in list)')
+    args = parser.parse_args()
+
+    products = open_catalog(args.catalog) if args.catalog else None
+
+    try:
+        asyncio.run(serve(args.host, args.port, products, args.top_k, args.max_batch,
+                          args.batch_window_ms / 1000, args.queue_depth, args.max_body))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
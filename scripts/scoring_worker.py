@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Scoring Worker
+
+This script keeps the risk assessment and recommendation functions loaded
+in a long-lived process and answers framed JSON requests, so the API
+routes don't pay interpreter startup and temp-file I/O on every call.
+
+Requests are newline-delimited JSON objects:
+    {"id": "42", "method": "risk-assessment", "params": {...farm data...}}
+Responses echo the request id, so callers can keep many requests in flight:
+    {"id": "42", "result": {...}}  or  {"id": "42", "error": "..."}
+
+--codec orjson speaks the same protocol through orjson; --codec msgpack
+switches to length-prefixed MessagePack frames (see wire_formats.py).
+
+Usage:
+    python3 scoring_worker.py                  # serve over stdin/stdout
+    python3 scoring_worker.py --socket PATH    # serve over a Unix socket
+    python3 scoring_worker.py --metrics-port 9464
+
+With --metrics or --metrics-port, per-stage timings and counters are
+accumulated across requests; they are returned by the 'metrics' method and,
+with --metrics-port, served as Prometheus text on 127.0.0.1:PORT/metrics.
+"""
+
+import os
+import sys
+import argparse
+import socketserver
+
+from risk_assessment import assess_farm
+from recommendations import recommend_products
+from farm_report import farm_report
+from product_catalog import open_catalog
+from result_cache import DEFAULT_MAX_ENTRIES, FORECAST_REFRESH_SECONDS, ResultCache
+from metrics import NULL_METRICS, Metrics, serve_prometheus
+from wire_formats import CODEC_NAMES, JSON_CODEC, encode_frame, get_codec, read_frames
+
+# Repeated dashboard loads for the same farm are answered from here
+RESULT_CACHE = ResultCache()
+
+# Totals across all requests, or None while instrumentation is off
+WORKER_METRICS = None
+
+# Wire format for requests and responses
+CODEC = JSON_CODEC
+
+# Recommendations carry product IDs instead of full products
+PRODUCT_IDS = False
+
+# Catalog for recommendations; None uses the built-in list
+CATALOG = None
+
+METHODS = {
+    'risk-assessment': lambda params, metrics: assess_farm(params, RESULT_CACHE, metrics),
+    'recommendations': lambda params, metrics: recommend_products(params, CATALOG, metrics=metrics,
+                                                                  product_ids=PRODUCT_IDS),
+    'farm-report': lambda params, metrics: farm_report(params, CATALOG, cache=RESULT_CACHE, metrics=metrics,
+                                                       product_ids=PRODUCT_IDS),
+    'cache-stats': lambda params, metrics: RESULT_CACHE.stats() if RESULT_CACHE else None,
+    'metrics': lambda params, metrics: WORKER_METRICS.to_dict() if WORKER_METRICS else None,
+    'ping': lambda params, metrics: 'pong'
+}
+
+def handle_request(payload):
+    """
+    Decode one request payload, dispatch it and return the framed response
+    """
+    request_id = None
+    metrics = Metrics() if WORKER_METRICS else NULL_METRICS
+    try:
+        with metrics.stage('decode'):
+            request = CODEC.loads(payload)
+        request_id = request.get('id')
+        method = METHODS.get(request.get('method'))
+        if method is None:
+            raise ValueError(f"Unknown method: {request.get('method')}")
+        response = {'id': request_id, 'result': method(request.get('params', {}), metrics)}
+    except Exception as e:
+        metrics.count('errors')
+        response = {'id': request_id, 'error': str(e)}
+
+    with metrics.stage('encode'):
+        output = encode_frame(CODEC, response)
+    if WORKER_METRICS:
+        metrics.count('requests')
+        WORKER_METRICS.merge(metrics)
+    return output
+
+def serve_stdio(stdin=sys.stdin.buffer, stdout=sys.stdout.buffer):
+    """
+    Answer requests from stdin until it is closed
+    """
+    for payload in read_frames(stdin, CODEC):
+        stdout.write(handle_request(payload))
+        stdout.flush()
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    """
+    Answer every request sent over one socket connection
+    """
+    def handle(self):
+        for payload in read_frames(self.rfile, CODEC):
+            self.wfile.write(handle_request(payload))
+            self.wfile.flush()
+
+class ScoringServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+def serve_socket(socket_path):
+    """
+    Answer requests from any number of concurrent Unix socket connections
+    """
+    # Remove a stale socket left behind by a previous worker
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+
+    with ScoringServer(socket_path, RequestHandler) as server:
+        try:
+            server.serve_forever()
+        finally:
+            os.unlink(socket_path)
+
+def main():
+    """
+    Main function to start the worker on stdio or a Unix socket
+    """
+    parser = argparse.ArgumentParser(description='Long-lived scoring worker')
+    parser.add_argument('--socket', help='Serve on this Unix socket path instead of stdin/stdout')
+    parser.add_argument('--catalog', default=os.environ.get('PRODUCT_CATALOG'),
+                        help='Compiled product catalog (defaults to $PRODUCT_CATALOG, else the built-in list)')
+    parser.add_argument('--cache-size', type=int, default=DEFAULT_MAX_ENTRIES,
+                        help='Assessments kept in the in-memory cache (0 disables caching)')
+    parser.add_argument('--cache-dir', help='Also cache assessments on disk in this directory')
+    parser.add_argument('--cache-ttl', type=int, default=FORECAST_REFRESH_SECONDS,
+                        help='Forecast refresh interval in seconds; cached results expire at the next refresh')
+    parser.add_argument('--metrics', action='store_true', help='Accumulate per-stage timings and counters')
+    parser.add_argument('--metrics-port', type=int,
+                        help='Serve the metrics as Prometheus text on 127.0.0.1:PORT/metrics (implies --metrics)')
+    parser.add_argument('--codec', choices=CODEC_NAMES, default='json',
+                        help='Wire format for requests and responses (auto picks orjson when installed)')
+    parser.add_argument('--product-ids', action='store_true',
+                        help='Return product IDs instead of embedding full product objects')
+    args = parser.parse_args()
+
+    if args.cache_ttl <= 0:
+        parser.error('--cache-ttl must be a positive number of seconds')
+
+    global RESULT_CACHE, WORKER_METRICS, CODEC, PRODUCT_IDS, CATALOG
+    try:
+        CODEC = get_codec(args.codec)
+    except ValueError as e:
+        parser.error(str(e))
+    PRODUCT_IDS = args.product_ids
+
+    RESULT_CACHE = ResultCache(args.cache_size, args.cache_ttl, args.cache_dir) if args.cache_size else None
+
+    if args.metrics or args.metrics_port:
+        WORKER_METRICS = Metrics()
+    if args.metrics_port:
+        serve_prometheus(WORKER_METRICS, args.metrics_port)
+
+    if args.catalog:
+        CATALOG = open_catalog(args.catalog)
+
+    if args.socket:
+        serve_socket(args.socket)
+    else:
+        serve_stdio()
+
+if __name__ == "__main__":
+    main()
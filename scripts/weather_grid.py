@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Weather Grid
+
+Shared gridded weather for farms that only send their coordinates. Forecast
+cells are held in a grid hash keyed by (floor(latitude / cell size),
+floor(longitude / cell size)), so resolving a farm to its cell is a dict
+lookup. The weather summary and each crop's risk scores are computed once
+per cell and reused by every farm in that cell, so the weather work scales
+with cells x crops rather than with farms.
+
+Usage:
+    python3 weather_grid.py --grid grid.json farms.ndjson [--workers N]
+
+The grid file lists one daily weather window per forecast cell:
+    {"cellSize": 0.25,
+     "cells": [{"latitude": 21.1, "longitude": 75.6, "weatherData": [...]}, ...]}
+
+Farms carry location.latitude/longitude, soilData and crops. Farms that
+bring their own weatherData are assessed on it as usual. Each assessment
+names the cell it used as 'weatherCell'.
+"""
+
+import os
+import sys
+import json
+import math
+import argparse
+import functools
+
+from batch_runner import DEFAULT_CHUNK_SIZE, run_ndjson
+from risk_assessment import (
+    assess_farm,
+    assess_soil_health,
+    compile_assessment,
+    crop_risk_from_summary,
+    summarize_weather
+)
+from weather_series import WeatherSeries
+
+DEFAULT_CELL_SIZE = 0.25
+
+# Farms whose own cell has no forecast fall back to the nearest cell at most
+# this many cells away
+DEFAULT_SEARCH_RADIUS = 1
+
+class WeatherGrid:
+    """
+    Grid hash of forecast cells with per-cell summaries and crop risks memoized
+    """
+    def __init__(self, cell_size=DEFAULT_CELL_SIZE, search_radius=DEFAULT_SEARCH_RADIUS):
+        self.cell_size = cell_size
+        self.search_radius = search_radius
+        self.cells = {}
+        self._summaries = {}
+        self._crop_risks = {}
+
+    def cell_key(self, latitude, longitude):
+        """
+        Return the grid hash key of the cell containing a point
+        """
+        return math.floor(latitude / self.cell_size), math.floor(longitude / self.cell_size)
+
+    def add_cell(self, latitude, longitude, weather_data):
+        """
+        Store the weather window for the cell containing a point
+        """
+        if not isinstance(weather_data, WeatherSeries):
+            weather_data = WeatherSeries.from_records(weather_data)
+        key = self.cell_key(latitude, longitude)
+        self.cells[key] = weather_data
+        self._summaries.pop(key, None)
+        self._crop_risks = {entry: risk for entry, risk in self._crop_risks.items() if entry[0] != key}
+
+    def lookup(self, latitude, longitude):
+        """
+        Return the key of the cell holding weather for a point, or None
+
+        The point's own cell is used when it has weather; otherwise every
+        cell with weather within search_radius cells is considered and the
+        one whose centre is nearest the point wins. A cell two rings out
+        can be nearer than a corner cell of the first ring, so the whole
+        square is searched rather than stopping at the first ring.
+        """
+        row, column = key = self.cell_key(latitude, longitude)
+        if key in self.cells:
+            return key
+
+        radius = self.search_radius
+        candidates = [
+            (row + d_row, column + d_column)
+            for d_row in range(-radius, radius + 1)
+            for d_column in range(-radius, radius + 1)
+            if (row + d_row, column + d_column) in self.cells
+        ]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda cell: ((cell[0] + 0.5) * self.cell_size - latitude) ** 2 +
+                                                ((cell[1] + 0.5) * self.cell_size - longitude) ** 2)
+
+    def summary(self, key):
+        """
+        Return the weather summary for a cell, computing it on first use
+        """
+        summary = self._summaries.get(key)
+        if summary is None:
+            summary = self._summaries[key] = summarize_weather(self.cells[key])
+        return summary
+
+    def crop_risk(self, key, crop_type):
+        """
+        Return one crop's risk scores for a cell, computing them on first use
+        """
+        risk = self._crop_risks.get((key, crop_type))
+        if risk is None:
+            risk = self._crop_risks[(key, crop_type)] = crop_risk_from_summary(self.summary(key), crop_type)
+        return risk
+
+    def label(self, key):
+        """
+        Return a cell key as 'latitude,longitude' of its south-west corner
+        """
+        return f"{key[0] * self.cell_size:g},{key[1] * self.cell_size:g}"
+
+    def stats(self):
+        """
+        Return how many cells are loaded and how much has been precomputed
+        """
+        return {'cells': len(self.cells), 'summarizedCells': len(self._summaries),
+                'cropRisks': len(self._crop_risks)}
+
+    @classmethod
+    def from_dict(cls, data, search_radius=DEFAULT_SEARCH_RADIUS):
+        """
+        Build a grid from the parsed grid file
+        """
+        grid = cls(data.get('cellSize', DEFAULT_CELL_SIZE), search_radius)
+        for cell in data['cells']:
+            grid.add_cell(cell['latitude'], cell['longitude'], cell['weatherData'])
+        return grid
+
+@functools.lru_cache(maxsize=None)
+def _open_grid(path, search_radius, pid):
+    with open(path, 'r') as f:
+        return WeatherGrid.from_dict(json.load(f), search_radius)
+
+def open_grid(path, search_radius=DEFAULT_SEARCH_RADIUS):
+    """
+    Load a grid file once per process and reuse it for every record
+    """
+    return _open_grid(path, search_radius, os.getpid())
+
+def assess_gridded_farm(farm_data, grid):
+    """
+    Generate the risk assessment for a farm from its grid cell's weather
+
+    Farms with their own weatherData are assessed on it directly.
+    """
+    if farm_data.get('weatherData'):
+        return assess_farm(farm_data)
+
+    location = farm_data.get('location') or {}
+    latitude, longitude = location.get('latitude'), location.get('longitude')
+    if latitude is None or longitude is None:
+        raise ValueError('Farm has neither weatherData nor location coordinates')
+    key = grid.lookup(latitude, longitude)
+    if key is None:
+        raise ValueError(f"No weather cell within {grid.search_radius} cells of {latitude},{longitude}")
+
+    crop_risks = {}
+    for crop in farm_data.get('crops', []):
+        crop_type = crop.get('type', '')
+        crop_risks[crop_type] = grid.crop_risk(key, crop_type)
+
+    risk_assessment = compile_assessment(crop_risks, assess_soil_health(farm_data.get('soilData', {})))
+    risk_assessment['weatherCell'] = grid.label(key)
+    return risk_assessment
+
+def assess_grid_line(line_number, line, grid_path, search_radius=DEFAULT_SEARCH_RADIUS):
+    """
+    Assess one NDJSON farm record against the grid and return the JSON
+    output line, or an error line if the record is bad
+    """
+    if not line.strip():
+        return None
+    try:
+        result = assess_gridded_farm(json.loads(line), open_grid(grid_path, search_radius))
+    except Exception as e:
+        result = {"error": str(e), "line": line_number}
+    return json.dumps(result)
+
+def main():
+    """
+    Main function to assess farms against a shared weather grid
+    """
+    parser = argparse.ArgumentParser(description='Assess crop risks for farms using shared gridded weather')
+    parser.add_argument('input_file', nargs='?', help='NDJSON farm records ("-" for stdin)')
+    parser.add_argument('--grid', required=True, help='Gridded weather JSON file')
+    parser.add_argument('--search-radius', type=int, default=DEFAULT_SEARCH_RADIUS,
+                        help='Cells to search around a farm whose own cell has no weather')
+    parser.add_argument('--workers', type=int, default=0, help='Shard records across N worker processes')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='Records sent to a worker at a time')
+    args = parser.parse_args()
+
+    try:
+        # Load the grid up front so a bad file fails before any record is read
+        open_grid(args.grid, args.search_radius)
+    except Exception as e:
+        print(json.dumps({"error": str(e)}))
+        sys.exit(1)
+
+    process_line = functools.partial(assess_grid_line, grid_path=args.grid, search_radius=args.search_radius)
+    run_ndjson(process_line, args.input_file or '-', args.workers, args.chunk_size)
+
+if __name__ == "__main__":
+    main()
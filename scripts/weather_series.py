@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Weather Series
+
+Compact struct-of-arrays representation of daily weather. Each field is an
+array('d') column, so a multi-year series costs 8 bytes per value instead of
+a dict per day, and the risk calculators can walk the columns directly.
+
+parse_farm_json() decodes farm JSON and converts its weatherData into a
+WeatherSeries. The series is for holding long windows compactly (a grid of
+forecast cells, multi-year archives); it does not make a single parse plus
+assessment faster than scoring the decoded list of dicts directly, so the
+scoring scripts only use it when asked to with --weather-series.
+"""
+
+import json
+from array import array
+
+class WeatherSeries:
+    """
+    Daily weather held as parallel float columns
+
+    temperature_max and temperature_min default to the daily temperature
+    for days that don't report extremes.
+    """
+    __slots__ = ('temperature', 'humidity', 'rainfall', 'temperature_max', 'temperature_min')
+
+    def __init__(self):
+        self.temperature = array('d')
+        self.humidity = array('d')
+        self.rainfall = array('d')
+        self.temperature_max = array('d')
+        self.temperature_min = array('d')
+
+    def __len__(self):
+        return len(self.temperature)
+
+    def append(self, temperature, humidity, rainfall, temperature_max=None, temperature_min=None):
+        """
+        Add one day to the end of the series
+        """
+        self.temperature.append(temperature)
+        self.humidity.append(humidity)
+        self.rainfall.append(rainfall)
+        self.temperature_max.append(temperature if temperature_max is None else temperature_max)
+        self.temperature_min.append(temperature if temperature_min is None else temperature_min)
+
+    def rows(self):
+        """
+        Iterate (temperature, humidity, rainfall, max, min) tuples, one per day
+        """
+        return zip(self.temperature, self.humidity, self.rainfall, self.temperature_max, self.temperature_min)
+
+    def to_dict(self):
+        """
+        Return the columns as plain lists
+        """
+        return {
+            'temperature': self.temperature.tolist(),
+            'humidity': self.humidity.tolist(),
+            'rainfall': self.rainfall.tolist(),
+            'temperatureMax': self.temperature_max.tolist(),
+            'temperatureMin': self.temperature_min.tolist()
+        }
+
+    @classmethod
+    def from_records(cls, weather_data):
+        """
+        Build a series from a list of daily weather dicts
+
+        Each column is filled from one comprehension over the days, which
+        runs faster than appending day by day.
+        """
+        series = cls()
+        temperature = [day['temperature'] for day in weather_data]
+        series.temperature = array('d', temperature)
+        series.humidity = array('d', [day['humidity'] for day in weather_data])
+        series.rainfall = array('d', [day['rainfall'] for day in weather_data])
+        series.temperature_max = array('d', [value if day.get('temperatureMax') is None else day['temperatureMax']
+                                             for day, value in zip(weather_data, temperature)])
+        series.temperature_min = array('d', [value if day.get('temperatureMin') is None else day['temperatureMin']
+                                             for day, value in zip(weather_data, temperature)])
+        return series
+
+def attach_series(farm_data):
+    """
+    Replace a decoded farm's top-level weatherData list with a WeatherSeries
+
+    Records whose weatherData is missing or not day-shaped are left as they are.
+    """
+    if isinstance(farm_data, dict) and isinstance(farm_data.get('weatherData'), list):
+        try:
+            farm_data['weatherData'] = WeatherSeries.from_records(farm_data['weatherData'])
+        except (KeyError, TypeError, AttributeError):
+            pass
+    return farm_data
+
+def parse_farm_json(text):
+    """
+    Decode farm JSON and convert its daily weather into a WeatherSeries
+    """
+    return attach_series(json.loads(text))
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Wire Formats
+
+Pluggable encoders for the scoring scripts and the scoring worker:
+
+    json     the standard library codec (always available)
+    orjson   orjson when it is installed; same JSON text, much faster
+    msgpack  binary MessagePack, worker mode only (needs msgpack installed)
+    auto     orjson when installed, else json
+
+Text codecs frame messages as newline-delimited lines. MessagePack frames
+are a 4-byte big-endian length followed by the packed payload, since packed
+bytes may contain newlines.
+"""
+
+import json
+import struct
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+CODEC_NAMES = ('auto', 'json', 'orjson', 'msgpack')
+TEXT_CODEC_NAMES = ('auto', 'json', 'orjson')
+
+_FRAME_HEADER = struct.Struct('>I')
+
+class JsonCodec:
+    """
+    Standard library JSON, newline framed
+    """
+    name = 'json'
+    binary = False
+
+    def loads(self, data):
+        return json.loads(data)
+
+    def dumps(self, value):
+        return json.dumps(value)
+
+    def dump_bytes(self, value):
+        return json.dumps(value).encode('utf-8')
+
+class OrjsonCodec:
+    """
+    orjson, newline framed
+
+    orjson writes compact JSON and encodes NaN as null.
+    """
+    name = 'orjson'
+    binary = False
+
+    def loads(self, data):
+        return orjson.loads(data)
+
+    def dumps(self, value):
+        return orjson.dumps(value).decode('utf-8')
+
+    def dump_bytes(self, value):
+        return orjson.dumps(value)
+
+class MsgpackCodec:
+    """
+    MessagePack, length-prefix framed
+    """
+    name = 'msgpack'
+    binary = True
+
+    def loads(self, data):
+        return msgpack.unpackb(data, raw=False)
+
+    def dump_bytes(self, value):
+        return msgpack.packb(value, use_bin_type=True)
+
+JSON_CODEC = JsonCodec()
+ORJSON_CODEC = OrjsonCodec()
+MSGPACK_CODEC = MsgpackCodec()
+
+def get_codec(name='json'):
+    """
+    Return the codec for a --codec option value
+
+    Raises ValueError for unknown names or codecs whose package is missing.
+    """
+    if name == 'auto':
+        name = 'orjson' if orjson is not None else 'json'
+    if name == 'json':
+        return JSON_CODEC
+    if name == 'orjson':
+        if orjson is None:
+            raise ValueError('The orjson codec needs the orjson package (pip install orjson)')
+        return ORJSON_CODEC
+    if name == 'msgpack':
+        if msgpack is None:
+            raise ValueError('The msgpack codec needs the msgpack package (pip install msgpack)')
+        return MSGPACK_CODEC
+    raise ValueError(f"Unknown codec: {name}")
+
+def read_frames(stream, codec):
+    """
+    Yield each message payload from a binary stream, skipping blank lines
+    """
+    if not codec.binary:
+        for line in stream:
+            if line.strip():
+                yield line
+        return
+
+    while True:
+        header = stream.read(_FRAME_HEADER.size)
+        if len(header) < _FRAME_HEADER.size:
+            return
+        (length,) = _FRAME_HEADER.unpack(header)
+        payload = stream.read(length)
+        if len(payload) < length:
+            return
+        yield payload
+
+def encode_frame(codec, value):
+    """
+    Encode one message together with its framing
+    """
+    payload = codec.dump_bytes(value)
+    if codec.binary:
+        return _FRAME_HEADER.pack(len(payload)) + payload
+    return payload + b'\n'